@@ -1,5 +1,8 @@
 from pattern.db import Datasheet
 
+from lexique import rows, lexicons
+from instrument import stage
+
 # STEP ONE: ACQUIRING LINGUISTIC DATA
 # ===================================
 # I found this great resource for French we can use, called "Lexique":
@@ -16,9 +19,11 @@ from pattern.db import Datasheet
 
 # The fields in the Lexique corpus are separated by tabs.
 # The first row is a header with the field labels.
-data = Datasheet.load("Lexique380/Bases+Scripts/Lexique380.txt", separator="\t")
-#print data[0]
-#print data[1]
+# Datasheet.load() would read the whole 24MB file into memory at once.
+# The lexique module reads it one line at a time instead (see lexique.py),
+# so it also works for lexical resources that are much bigger than Lexique.
+data = rows("Lexique380/Bases+Scripts/Lexique380.txt", separator="\t")
+#print data.next()
 
 # For sentiment analysis, we're interested in adjectives.
 # Adjectives is how people express emotion or personal opinion.
@@ -32,49 +37,44 @@ data = Datasheet.load("Lexique380/Bases+Scripts/Lexique380.txt", separator="\t")
 # - 1st field (1_ortho => "belle"), 
 # - 3rd field (3_lemme => "beau"),
 # - 4th field (4_cgram => NOM, ADJ, VER, ...),
-# - 8th field (8_freqlemlivres => frequency of lemma in books)
-adjectives = {} # dictionary of lemma => [frequency, [form1, form2, ...]]
-for row in data:
-    form, lemma, tag, weight = (
-        row[0],
-        row[2],
-        row[3],
-        row[7]
-    )
-    # The frequency is important.
-    # Most languages have tens of thousands of adjectives.
-    # We want to start by covering the most frequent ones,
-    # and leave the less important ones for later.
-    # Most languages have an exponential Zipf-distribution of word occurences.
-    if tag == "ADJ":
-        if lemma not in adjectives:
-            adjectives[lemma] = [0, []]
-        adjectives[lemma][0] = float(weight) # Convert string to number.
-        adjectives[lemma][1].append(form)
-#print adjectives
+# - 10th field (10_freqlivres => frequency of the form in books)
+# The frequency is important.
+# Most languages have tens of thousands of adjectives.
+# We want to start by covering the most frequent ones,
+# and leave the less important ones for later.
+# Most languages have an exponential Zipf-distribution of word occurences.
+# The frequency of a lemma is the sum of the frequency of its forms.
+
+# While we are reading the file anyway, we can also collect nouns and verbs,
+# to test if they improve the classifier (see 4-svm.py).
+# Each word class is saved as a separate lexicon.
+# Remove "NOM" and "VER" if you only need the adjectives.
+tags = {
+    "ADJ": "adj-fr.csv",
+    "NOM": "nom-fr.csv",
+    "VER": "ver-fr.csv"
+}
 
-# We now want to sort the dictionary by frequency.
-# The items() method of a Python dictionary returns a list of (key, value)-tuples.
-# In our case, (lemma, [frequency, [form1, form2, ...]]), for example:
-# ("beau", [620.07, ["beau", "beaux", "belle", "belles"]])
-# We'll make a new list with the frequency at the start of each tuple.
-# We can then sort the list by frequency.
-adjectives = adjectives.items()
-adjectives = [(weight, lemma, forms) for lemma, (weight, forms) in adjectives]
-adjectives = sorted(adjectives, reverse=True) # Highest-first.
-#print adjectives
+# The lexicons() function returns a dictionary of tag => list of (frequency, lemma, forms)-tuples.
+# Each list is sorted by frequency, highest-first, for example:
+# (620.07, "beau", ["beau", "beaux", "belle", "belles"])
+with stage("load"):
+    lexicon = lexicons(data, tags=tags.keys())
+#print lexicon["ADJ"][:10]
 
 # We want to save our list of adjectives as a new corpus.
 # Something more manageable than 24MB.
 # I prefer a new .csv file with two fields: lemma, and forms (comma-separated).
 # Adjectives higher up in the list are more frequent,
 # we should deal with those first to get a good coverage.
-corpus = Datasheet()
-for frequency, lemma, forms in adjectives:
-    field1 = lemma
-    field2 = ",".join(forms) # Collapse list to comma-separated string.
-    corpus.append( [field1, field2] )
-corpus.save("adj-fr.csv")
+for tag, path in tags.items():
+    corpus = Datasheet()
+    for frequency, lemma, forms in lexicon[tag]:
+        field1 = lemma
+        field2 = ",".join(forms) # Collapse list to comma-separated string.
+        corpus.append( [field1, field2] )
+    with stage("save"):
+        corpus.save(path)
 
 # We end up with a 500KB list of words commonly used to express emotion or opinion,
 # sorted by how often they occur in books,
@@ -1,5 +1,16 @@
-from pattern.web import URL, DOM, plaintext
-from pattern.db import Datasheet
+from pattern.web import URL
+
+from crawler import Crawler
+from corpus import CorpusWriter, rows
+from dedup import Unique
+from pagecache import PageCache
+from instrument import stage, timed
+
+import extract
+
+import os
+import re
+import sys
 
 # STEP TWO: ACQUIRING TEST DATA
 # =============================
@@ -25,9 +36,27 @@ from pattern.db import Datasheet
 # http://www.amazon.fr/s/ref=sr_pg_3?rh=n%3A301061%2Cn%3A%21301130%2Cn%3A301132%2Cn%3A302038&page=3&ie=UTF8&qid=1354669111
 
 # We can throw out the last "ie" and "qid" parts it seems.
-# Also, the "current page" is defined by the number in the url, which we can replace with a variable:
+# Also, the "current page" is defined by the number in the url, which we can replace with a variable.
+# To test the crawler without mining Amazon, you can run a local stand-in (see serve-fixtures.py)
+# and pass its address: python 2-amazon.py http://localhost:8000
+host = len(sys.argv) > 1 and sys.argv[1] or "http://www.amazon.fr"
+
+# The reviews are saved in books-fr.csv, which comes with the workshop.
+# Reviews from another host are saved in a file of their own (e.g., books-fr.localhost-8000.csv),
+# so that a test crawl never ends up in the real corpus.
+# You can also pass the file to use: python 2-amazon.py http://localhost:8000 test.csv
+def output(host):
+    """ Returns the path of the .csv file for reviews from the given host.
+    """
+    name = host.split("://")[-1].strip("/")
+    if name == "www.amazon.fr":
+        return "books-fr.csv"
+    return "books-fr.%s.csv" % re.sub(r"[^\w.-]+", "-", name)
+
+path = len(sys.argv) > 2 and sys.argv[2] or output(host)
+
 def books(i):
-    return "http://www.amazon.fr/s/ref=sr_pg_" + str(i) + \
+    return host + "/s/ref=sr_pg_" + str(i) + \
            "?rh=n%3A301061%2Cn%3A%21301130%2Cn%3A301132%2Cn%3A302038&page=" + str(i)
 
 # Try it out by pasting the URL in a browser:
@@ -40,70 +69,119 @@ def books(i):
 # In Pattern, the DOM (Document Object Model) is a tree of nested HTML elements,
 # along with useful methods to traverse and search the tree.
 # http://www.clips.ua.ac.be/pages/pattern-web#DOM
-# It is easy to fetch each <div class="prod">:
+# It is easy to fetch each <div class="prod">.
+# But building the DOM for each page takes time and memory, and we only need a few things in it.
+# The extract module (see extract.py) reads the HTML once from start to end, without building a tree,
+# and returns the same things as the DOM code in the comments below.
 
-corpus = Datasheet()
+# Downloading 45 overview pages and then each book page one after another takes hours.
+# The Crawler class (see crawler.py) downloads pages in parallel,
+# but never more than 2 at the same time and 1 per second on average from the same host.
+# Each downloaded page is passed to the handler() function below.
+# Overview pages return the review pages to crawl next.
+# The crawler keeps a log of queued and finished pages in books-fr.crawl (next to the .csv file).
+# If the script crashes (or you press Ctrl-C), running it again continues where it stopped.
 
-for i in range(45): # How many pages?
-    url = books(i+1)
-    url = URL(url)
-    html = url.download(cached=True) # Cache the HTML source locally.
-    for product in DOM(html).by_class("prod"):
-        #print product.source
+# The reviews are appended to the .csv file as they come in (see corpus.py).
+# Saving the whole corpus after every book would get slower and slower.
+corpus = None
 
+@timed("parse")
+def handler(url, html, kind):
+    
+    if kind == "books":
+        reviews = []
+        # With the DOM:
+        # for product in DOM(html).by_class("prod"):
+        #     a = product.by_tag("a")[0]
+        #     a = a.attributes["href"]
+        #
         # The link to each book page looks something like:
-        # http://www.amazon.fr/dieux-voyagent-toujours-incognito/dp/2266219154/        
-        a = product.by_tag("a")[0]
-        a = a.attributes["href"]
-        #print a
-
-        # After some searching with Chrome, 
+        # http://www.amazon.fr/dieux-voyagent-toujours-incognito/dp/2266219154/
+        #
+        # After some searching with Chrome,
         # I found that there is a page with 10 reviews about this book:
         # http://www.amazon.fr/product-reviews/2266219154/
         # So we want to parse the book id from the first link and mine its reviews page:
-        id = a.split("/")[-2]
-        reviews = "http://www.amazon.fr/product-reviews/" + id + "/"
-        print reviews
+        #     id = a.split("/")[-2]
+        for id in extract.products(html):
+            reviews.append((host + "/product-reviews/" + id + "/", "reviews"))
+        return reviews
+        
+    if kind == "reviews":
+        print url
         
         # We can use Chrome's Developer Tools to inspect the HTML of the review page.
         # It turns out the reviews are contained in a <table id="productReviews"> element.
         # This table has one row and two columns.
         # Each <div> in the first column is a review.
         # If the table is absent, it means there are no reviews for this book.
-        reviews = URL(reviews).download(cached=True, throttle=20) # throttle = delay between crawls
-        reviews = DOM(reviews).by_id("productReviews")
-        if reviews is not None:
-            for review in reviews.by_tag("div"):
-                # We use a try-except statement to brute-force it:
-                # The <div>'s in the table do not have a class to search for,
-                # and there may be other <div>'s in-between, which end up in the except-block. 
-                try:
-                    # The star rating is <span class="swSprite s_star_5_0 " title="5.0 etoiles sur 5">.
-                    score = review.by_class("swSprite")[0]
-                    score = score.attributes["title"]
-                    score = score.split(" ")[0]
-                    score = float(score)
-                
-                    # The review is contained as plain text in the <div>.
-                    text = ""
-                    for child in review.children:
-                        if child.type == "text":
-                            text += child.source + " "
-                    text = text.strip()
-                    text = plaintext(text) # Remove HTML entities, tags, etc.
-                    
-                    if text:
-                        corpus.append((text, score))
-                        print score
-                        print text
-                        print
-                
-                except Exception, e:
-                    #print e
-                    pass
-
-        # Now and then, save the corpus of (review, score) items as a .csv file.
-        corpus.save("books-fr.csv")
+        # With the DOM:
+        # reviews = DOM(html).by_id("productReviews")
+        # if reviews is not None:
+        #     for review in reviews.by_tag("div"):
+        #         # We use a try-except statement to brute-force it:
+        #         # The <div>'s in the table do not have a class to search for,
+        #         # and there may be other <div>'s in-between, which end up in the except-block.
+        #         try:
+        #             # The star rating is <span class="swSprite s_star_5_0 " title="5.0 etoiles sur 5">.
+        #             score = review.by_class("swSprite")[0]
+        #             score = float(score.attributes["title"].split(" ")[0])
+        #             # The review is contained as plain text in the <div>.
+        #             text = " ".join(child.source for child in review.children if child.type == "text")
+        #             text = plaintext(text.strip()) # Remove HTML entities, tags, etc.
+        #         except:
+        #             pass
+        reviews = extract.reviews(html)
+        for text, score in reviews:
+            corpus.append((text, score))
+
+        # After each book, flush the new (review, score) items to the .csv file,
+        # so the crawler only marks the page as done once its reviews are on disk.
+        with stage("save"):
+            corpus.flush()
+
+        # The reviews are printed after they are saved, so an error here can't lose them.
+        # They are encoded as UTF-8, since print uses ASCII when the output is not a terminal.
+        for text, score in reviews:
+            print score
+            print text.encode("utf-8")
+            print
+
+# URL.download(cached=True) keeps a copy of each page, so we don't download it again next time.
+# The page cache (see pagecache.py) does the same, but compressed, and with a maximum size,
+# so we switch off Pattern's own cache with cached=False.
+# With unicode=True, each page is decoded once, with its own encoding (UTF-8, or else Windows-1252),
+# so extract.py gets a Unicode string, whether the page comes from the web or from the cache.
+cache = PageCache(os.path.splitext(path)[0] + ".pages")
+
+@timed("download")
+def fetch(url):
+    html = cache.get(url)
+    if html is None:
+        html = URL(url).download(cached=False, unicode=True)
+        cache.set(url, html)
+    return html
+
+crawler = Crawler(handler, fetch=fetch, frontier=os.path.splitext(path)[0] + ".crawl")
+
+# New reviews are added to the reviews we already have, whether we are resuming an interrupted crawl or not.
+# The .csv file is never removed: to start a new corpus, delete it yourself, or pass another path.
+corpus = CorpusWriter(path, fields=2)
+
+# The same review is shown for each edition of a book (paperback, pocket, ...).
+# Reviews that are (nearly) the same as a review we already have are not saved (see dedup.py).
+# The reviews we already have are added first.
+corpus = Unique(corpus, [review for review, score in rows(path)])
+
+for i in range(45): # How many pages?
+    crawler.push(books(i+1), "books")
+
+crawler.run()
+corpus.close()
+print corpus.dedup
+print cache
+cache.close()
         
 # Can you think of other test data to mine for?
 # Can you see why it would be useful to have different test sets?
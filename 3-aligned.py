@@ -1,6 +1,9 @@
 from pattern.db import Datasheet
 
-from random import shuffle
+from corpus import rows
+from dedup import Dedup
+from sampling import Stratified, BINARY, STARS
+from instrument import stage
 
 # STEP THREE: SETTING UP A TEST FRAMEWORK
 # =======================================
@@ -9,25 +12,64 @@ from random import shuffle
 # We can use the lexicon to build a sentiment prediction algorithm,
 # and evaluate how well it performs on the test data.
 
-data = Datasheet.load("books-fr.csv")
-print "number of reviews:", len(data)
-
-# We have 5,444 reviews + score.
-# More data = better training material + more reliable testing.
-# To set up a test that is statistically solid, we need to "align" the data.
 # It is a good idea to remove neutral reviews (= star rating 3),
 # and have an equal amount of negative (= star rating 1-2) and positive (= 4-5) reviews.
 # This is a form of binary classification:
 # Either a review in the test data is positive or it is not.
+# The classes are a dict of star rating => class (see sampling.py).
+# With classes = STARS, each star rating is a class (1-5) and nothing is discarded.
+classes = BINARY
+
+# The maximum number of reviews per class.
+m = 500
 
-# Let's look at the distribution of the data:
+# With the same seed, we get the same sample every time we run the script.
+# With seed = None, we get a different sample each time.
+seed = 0
+
+# Optionally, the sample can be split into parts for training, tuning and testing,
+# each with the same number of reviews per class, saved as books-fr.train.csv, books-fr.dev.csv, ...
+# By default, the whole sample is saved as books-fr.test.csv.
+splits = None # [("train", 0.8), ("dev", 0.1), ("test", 0.1)]
+
+# With dedup = True, reviews that are (nearly) the same as another review are skipped (see dedup.py),
+# so that the same review does not end up both in the training data and in the test data.
+# This matters for a books-fr.csv crawled before 2-amazon.py removed duplicates.
+# It is off by default: it keeps a signature of every review that is not a duplicate,
+# so memory grows with the corpus, while the reservoirs below never keep more than m reviews per class.
+# For a large corpus, remove the duplicates once with a separate pass instead:
+# python dedup.py books-fr.csv books-fr.dedup.csv
+dedup = False
+
+# The corpus can be large, so we read it one row at a time (see corpus.py),
+# and do everything we need in a single pass.
+# We also want to look at the distribution of the data (number of reviews per star rating).
+# The reviews are sampled at random, with a "reservoir" of m reviews per class,
+# so that reviews of the last books we crawled have the same chance as those of the first,
+# and so that we never keep more than m reviews per class in memory.
+n = 0
 distribution = {}
-for review, score in data:
-    score = float(score)
-    if score not in distribution:
-        distribution[score] = 0
-    distribution[score] += 1
-    
+sample = Stratified(classes, k=m, seed=seed)
+duplicates = dedup and Dedup() or None
+with stage("load"):
+    for review, score in rows("books-fr.csv"):
+        if duplicates and duplicates.add(review) is not None:
+            continue
+        score = float(score)
+        if score not in distribution:
+            distribution[score] = 0
+        distribution[score] += 1
+        n += 1
+        sample.add(review, score)
+
+print "number of reviews:", n
+if duplicates:
+    print "near-duplicates skipped:", duplicates.duplicates
+
+# We have 5,444 reviews + score.
+# More data = better training material + more reliable testing.
+# To set up a test that is statistically solid, we need to "align" the data.
+
 print "distribution of reviews by star rating:", distribution
 
 # As can be expected, the data is skewed: 519 negative vs. 4,925 positive reviews.
@@ -37,32 +79,18 @@ print "distribution of reviews by star rating:", distribution
 # while in reality in might be very bad at detecting negative reviews
 # (for example, it could be predicting *all* test reviews as positive).
 
-aligned = {
-    -1: [], 
-    +1: []
-}
-for review, score in data:
-    score = float(score)
-    if score == 3: # Discard neutral reviews.
-        continue
-    if score < 3:
-        aligned[-1].append(review)
-    if score > 3:
-        aligned[+1].append(review)
-m = min(len(aligned[-1]), len(aligned[+1]))
-m = min(m, 500)
-aligned[-1] = aligned[-1][:m]
-aligned[+1] = aligned[+1][:m]
-
-print "aligned test corpus:"
-print len(aligned[-1])
-print len(aligned[+1])
-
 # The aligned list contains (review, positive)-tuples,
 # where positive is either True or False,
-# with an equal amount of True and False reviews:
-aligned = [(review, False) for review in aligned[-1]] + \
-          [(review, True) for review in aligned[+1]]
-shuffle(aligned)
+# with an equal amount of True and False reviews (in random order):
+aligned = sample.aligned()
+
+print "aligned test corpus:"
+for c, r in sorted(sample.reservoirs.items()):
+    print c, len([x for x in aligned if x[1] == c]), "of", r.n
 
-Datasheet(aligned).save("books-fr.test.csv")
\ No newline at end of file
+with stage("save"):
+    if not splits:
+        Datasheet(aligned).save("books-fr.test.csv")
+    else:
+        for name, data in sample.split(aligned, splits).items():
+            Datasheet(data).save("books-fr.%s.csv" % name)
@@ -1,6 +1,16 @@
-from pattern.db import Datasheet
 from pattern.vector import SVM
 
+from time import time
+
+from corpus import rows
+from preprocess import Cache
+from roc import sweep, auc, best
+from instrument import stage, timed
+from online import Online
+
+import crossval
+import preprocess
+
 # STEP FOUR: TRAINING & TESTING A SUPPORT VECTOR MACHINE
 # ======================================================
 
@@ -8,8 +18,8 @@ from pattern.vector import SVM
 # Each row has a review text (column 1) and a positive/negative label (column 2).
 # Since it was saved as a text file (i.e., a string), 
 # we need to convert column 2 back to boolean values:
-data = Datasheet.load("books-fr.test.csv")
-data.columns[1].map(lambda v: v == "True")
+with stage("load"):
+    data = [(review, positive == "True") for review, positive in rows("books-fr.test.csv")]
 
 # Machine learning broadly uses two statistical techniques:
 # - unsupervised machine learning (= classification), and
@@ -24,8 +34,9 @@ data.columns[1].map(lambda v: v == "True")
 # Training an SVM is very easy, 
 # just give it strings or lists of words and a label as training material:
 classifier = SVM()
-for review, positive in data[:50]: # Note: 50 training examples is very little data!
-    classifier.train(review, type=positive)
+with stage("train"):
+    for review, positive in data[:50]: # Note: 50 training examples is very little data!
+        classifier.train(review, type=positive)
 
 # The idea is that similar strings will contain similar words.
 # For an unknown example, the SVM examine the words it contains,
@@ -61,7 +72,8 @@ print
 
 # The classmethod SVM.test() takes a dataset for training and testing
 # and returns a (accuracy, precision, recall, F1-score)-tuple:
-print SVM.test(data, folds=3) # 3 tests with different 66% train / 33% test slices.
+with stage("test"):
+    print SVM.test(data, folds=3) # 3 tests with different 66% train / 33% test slices.
 print
 
 # You will notice 2 things:
@@ -73,27 +85,77 @@ print
 # As we will see, this makes the classifier faster and more accurate (P 0.6 R 0.85).
 
 # Load the lexicon of French adjectives.
-adjectives = {}
-for lemma, forms in Datasheet.load("adj-fr.csv"):
-    for form in forms.split(","):
-        adjectives[form] = True
+# The lexicon is a dictionary of form => form, with each form also without accents
+# (see tokenizer.py), so that an adjective typed without accents is still found,
+# and becomes the same feature as the adjective with accents.
+with stage("load"):
+    adjectives = preprocess.adjectives("adj-fr.csv")
 
+# Splitting the reviews into words is the same work every time we run this script.
+# The cache (see preprocess.py) remembers the words in each review, in tokens.db.
+cache = Cache()
+
+@timed("normalize")
 def normalize(review):
     """ Returns a list of (lowercase) adjectives from the given string.
-        Punctuation marks (,.!?) are stripped from each word.
+        Punctuation marks are separators (see tokenizer.words()).
     """
-    review = review.lower()
-    review = review.split(" ")
-    review = [w.strip(",.!?") for w in review]
-    review = [w for w in review if w in adjectives]
-    return review
+    return preprocess.normalize(review, adjectives, cache)
 
 # Observe how a training example becomes a lot smaller:
 print normalize(data[51][0])
 print
 
-# Observe how precision and recall increase by removing noise:
-print SVM.test([(normalize(review), positive) for review, positive in data], folds=10)
+# Observe how precision and recall increase by removing noise.
+# Instead of SVM.test(), we use crossval.test(), which does the same thing,
+# but tests the 10 folds in parallel on all cores of your computer:
+# The results and the time are kept, to compare with the Online classifier below.
+documents = [(normalize(review), positive) for review, positive in data]
+t = time()
+with stage("crossval"):
+    svm = crossval.test(SVM, documents, folds=10)
+svm_time = time() - t
+print svm
+print
+
+# The SVM predicts True or False, which is the same as a threshold of 0.5 on the probability of True.
+# Is that the best threshold? With probability=True, the SVM also returns the probability of each class.
+# We train on the first half of the data and get the probability for the second half.
+# Then we evaluate all thresholds at once (see roc.py).
+n = len(data) / 2
+classifier = SVM(probability=True)
+with stage("train"):
+    for review, positive in data[:n]:
+        classifier.train(normalize(review), type=positive)
+with stage("test"):
+    scores = [classifier.classify(normalize(review), discrete=False).get(True, 0.0) for review, positive in data[n:]]
+    curve = sweep(scores, [positive for review, positive in data[n:]])
+print "AUC:", auc(curve)
+print "best threshold (t, A, P, R, F1, FPR):", best(curve)
+print
+
+# The SVM learns from all the training data at once.
+# When we crawl new reviews, it has to start over, and it remembers every word it has seen.
+# The Online classifier (see online.py) learns one review at a time, with a fixed amount of memory,
+# so new reviews can be added to a classifier that was trained before. Is it as accurate?
+# The SVM was already tested on the same documents above.
+print "SVM", svm, "(%.1fs)" % svm_time
+t = time()
+with stage("online"):
+    print "Online", crossval.test(Online, documents, folds=10),
+print "(%.1fs)" % (time() - t)
+
+# Since the number of features is fixed, the Online classifier can use all the words in a review,
+# not just the adjectives, and also each pair of successive words ("pas bon", "trop long"):
+t = time()
+with stage("online"):
+    print "Online (all words + pairs)", Online.test(data, folds=10, ngrams=2),
+print "(%.1fs)" % (time() - t)
+print
+
+# Run the script a second time to see the difference:
+print cache
+cache.close()
 print
 
 # Can you think of ways to improve the accuracy?
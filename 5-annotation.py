@@ -1,5 +1,12 @@
 from pattern.db import Datasheet
-from pattern.metrics import avg, test, agreement
+from pattern.metrics import avg, test
+
+from preprocess import Cache
+from tokenizer import words, folded
+from roc import sweep, auc, average_precision, best
+from instrument import stage, count
+
+import agreement
 
 # STEP FIVE: MANUAL ANNOTATION
 # ============================
@@ -21,39 +28,72 @@ from pattern.metrics import avg, test, agreement
 
 # Load the sentiment lexicon.
 sentiment = {}
-for row in Datasheet.load("sentiment.csv - Sheet 1.csv", headers=True):
-    scores = [float(x) for x in row[3:] if x != ""] # Exclude empty fields.
-    if scores:
-        sentiment[row[0]] = avg(scores)
-# Inherit the score of each adjective to the inflected forms of the adjective.
-# If parfait = +1.0, then parfaite = +1.0 and parfaites = +1.0.
-for lemma, forms in Datasheet.load("adj-fr.csv"):
-    for form in forms.split(","):
-        if lemma in sentiment:
-            sentiment[form] = sentiment[lemma]
-            
-def positive(review, threshold=0.0):
-    """ Returns True if the given review is positive,
-        based on the average sentiment score of the adjectives in the text.
+with stage("load"):
+    for row in Datasheet.load("sentiment.csv - Sheet 1.csv", headers=True):
+        scores = [float(x) for x in row[3:] if x != ""] # Exclude empty fields.
+        if scores:
+            sentiment[row[0]] = avg(scores)
+    # Inherit the score of each adjective to the inflected forms of the adjective.
+    # If parfait = +1.0, then parfaite = +1.0 and parfaites = +1.0.
+    for lemma, forms in Datasheet.load("adj-fr.csv"):
+        for form in forms.split(","):
+            if lemma in sentiment:
+                sentiment[form] = sentiment[lemma]
+    # Each form is also a key without accents (see tokenizer.py).
+    sentiment = folded(sentiment)
+
+# The cache (see preprocess.py) remembers the words in each review, in tokens.db,
+# so the next time we run the script, we don't need to split the reviews again.
+cache = Cache()
+
+def score(review):
+    """ Returns the average sentiment score of the adjectives in the given string.
     """
     score = 0.0
     n = 0
-    for w in review.replace("\n", " ").split(" "):
-        w = w.lower()
-        w = w.strip(",.!?")
+    tokens = cache.tokenize(review, words)
+    for w in tokens:
         if w in sentiment:
             score += sentiment[w]
             n += 1
-    return score / (n or 1) > threshold
+    count("tokens seen", len(tokens))
+    count("lexicon hits", n)
+    count("lexicon misses", len(tokens) - n)
+    return score / (n or 1)
+
+def positive(review, threshold=0.0):
+    """ Returns True if the given review is positive,
+        based on the average sentiment score of the adjectives in the text.
+    """
+    return score(review) > threshold
 
 # Load the testing data.
-data = Datasheet.load("books-fr.test.csv")
-data.columns[1].map(lambda v: v == "True")
+with stage("load"):
+    data = Datasheet.load("books-fr.test.csv")
+    data.columns[1].map(lambda v: v == "True")
 
 # I quickly annotated the top 50 adjectives and got 
 # P 0.56 and R 0.78, which approximates the performance of the SVM.
 # We can probably get better scores by annotating more adjectives.
-print test(lambda review: positive(review), data)
+with stage("test"):
+    print test(lambda review: positive(review), data)
+print
+
+# Is 0.0 the best threshold?
+# Instead of running the test again for each threshold, 
+# we compute the score of each review once, and then evaluate all thresholds at once (see roc.py).
+# The curve is saved as a .csv file, so you can plot it in a spreadsheet.
+with stage("test"):
+    curve = sweep([score(review) for review, positive in data], [positive for review, positive in data])
+print "AUC:", auc(curve)
+print "average precision:", average_precision(curve)
+print "best threshold (t, A, P, R, F1, FPR):", best(curve)
+with stage("save"):
+    Datasheet(curve).save("roc-lexicon.csv")
+print
+
+print cache
+cache.close()
 print
 
 # We can also calculate kappa on the manual annotation scores.
@@ -61,23 +101,22 @@ print
 # We want to know the general agreement of positive (+1) vs. negative (-1).
 # If the agreement is low, that means the sentiment lexicon is biased,
 # since the annotators did not agree on all scores.
-scores = Datasheet.load("sentiment.csv - Sheet 1.csv", headers=True)
-# 1) Cut off the first three columns.
-scores = scores[:,3:]
-# 2) Remove empty fields (= annotator did not enter a score for this adjective).
-scores = [[float(x) for x in row if x != ""] for row in scores]
-# 3) Calculate the maximum number of different annotators.
-n = max([len(row) for row in scores])
-# 4) Keep only rows for which each annotator entered a score.
-scores = [row for row in scores if len(row) == n]
-# 5) Sum all positive / negative / neutral votes per adjective.
-scores = [[len([x for x in row if x  > 0]), 
-           len([x for x in row if x  < 0]),
-           len([x for x in row if x == 0])] for row in scores]
-try:
-    print agreement(scores)
-except:
-    pass
+# The agreement module (see agreement.py) loads the scores into a matrix (adjectives x annotators).
+# A blank field (= annotator did not enter a score for this adjective) is a missing value.
+# Each score counts as a positive (+1), negative (-1) or neutral (0) vote.
+# Adjectives that not every annotator scored are still used, as long as they have 2+ scores.
+# Krippendorff's alpha is another measure of agreement, designed for missing data.
+# With the "interval" metric, positive vs. negative is a bigger disagreement than positive vs. neutral.
+# With a single annotator there is nothing to compare, so both are NaN.
+# When a new annotator adds a column, a.append(column) updates both without starting over.
+with stage("agreement"):
+    adjectives, scores = agreement.load("sentiment.csv - Sheet 1.csv")
+    a = agreement.Agreement(scores)
+print "annotators:", a.annotators
+print "Fleiss' kappa:", a.kappa()
+print "Krippendorff's alpha:", a.alpha()
+print "Krippendorff's alpha (interval):", a.alpha("interval")
+print
 
 # Can you think of ways to make the positive() function better?
 # - Should we do something with exclamation marks? (e.g., "belle" <=> "belle!")
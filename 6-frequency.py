@@ -1,5 +1,10 @@
 from pattern.db import Datasheet
 
+from frequency import count, words
+from corpus import rows
+from preprocess import Cache
+from instrument import stage
+
 # APPENDIX: BOOK REVIEWS ADJECTIVE FREQUENCY
 # ==========================================
 
@@ -7,43 +12,49 @@ from pattern.db import Datasheet
 # Each adjective has a column that shows its frequency in positive/negative reviews,
 # as a handy lead. This script calculates the frequencies.
 
-data = Datasheet.load("books-fr.csv")
-data.columns[1].map(lambda v: float(v))
-
 # We have to make a trade-off about what constitutes as a "positive" review
 # and what as a "negative" review. In this setup, I am only looking at reviews
 # with star rating ***** or *. Everything else is regarded as "neutral".
 # This will give us a rough indicator about which adjectives occur frequently
 # in very positive and very negative reviews.
 
-pos = [(review, score) for review, score in data if score == 5]
-neg = [(review, score) for review, score in data if score == 1]
-neu = [(review, score) for review, score in data if score > 1 and score < 5]
+# The corpus can be large, so we read it one row at a time (see corpus.py).
+pos = []
+neg = []
+neu = []
+with stage("load"):
+    for review, score in rows("books-fr.csv"):
+        score = float(score)
+        if score == 5:
+            pos.append((review, score))
+        if score == 1:
+            neg.append((review, score))
+        if score > 1 and score < 5:
+            neu.append((review, score))
 
 n = min(len(pos), len(neg), len(neu))
 data = pos[:n] + neg[:n] + neu[:n]
 
+# Count how often each adjective occurs in ***** / * / neutral reviews.
+# The frequency module tokenizes each review once and looks up every word
+# in a form => lemma table, so we can cover the whole lexicon
+# instead of only the top 2000 adjectives.
+# The cache (see preprocess.py) remembers the words in each review, in tokens.db.
+cache = Cache()
+with stage("count"):
+    counts = count(data, Datasheet.load("adj-fr.csv"), tokenize=lambda review: cache.tokenize(review, words))
+print cache
+cache.close()
+
 sentiment = []
-for i, (lemma, forms) in enumerate(Datasheet.load("adj-fr.csv")[:2000]):
-    pos = 0
-    neg = 0
-    neu = 0
-    for review, score in data:
-        review = " " + review.lower() + " "
-        review = review.replace("!", " ")
-        review = review.replace(".", " ")
-        review = review.replace(",", " ")
-        for form in forms.split(","):
-            form = " " + form + " " # Append a space so " tout " doesn't overlap with "toutes".
-            if score == 5:
-                pos += review.count(form)
-            if score == 1:
-                neg += review.count(form)
+for lemma, (pos, neg, neu) in counts:
     # Relativize scores between 0.0-1.0.
+    # The sheet on Google Docs compares ***** vs. * reviews only,
+    # so the neutral count is left out of the total.
     sentiment.append((lemma, 
-        "%.2f" % (pos / (float(pos + neg + neu) or 1)), # Percentage ****
-        "%.2f" % (neg / (float(pos + neg + neu) or 1))  # Percentage *
+        "%.2f" % (pos / (float(pos + neg) or 1)), # Percentage ****
+        "%.2f" % (neg / (float(pos + neg) or 1))  # Percentage *
     ))
-    print i
 
-Datasheet(sentiment).save("sentiment.csv")
\ No newline at end of file
+with stage("save"):
+    Datasheet(sentiment).save("sentiment.csv")
\ No newline at end of file
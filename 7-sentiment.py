@@ -1,33 +1,148 @@
-from pattern.db import Datasheet
-from pattern.metrics import avg
+from numpy import array, ones, diff, maximum
+from scipy.sparse import csr_matrix
+
+from instrument import timed, count, observe, ENABLED
+from tokenizer import words, folded
+
+import lexicon
 
 # This is just the stuff from 5-annotation.py, without the tests.
 # You can bundle it in an application for predicting sentiment in French text.
 
-sentiment = {}
-for row in Datasheet.load("sentiment.csv - Sheet 1.csv", headers=True):
-    scores = [float(x) for x in row[3:] if x != ""]
-    if scores:
-        sentiment[row[0]] = avg(scores)
-        
-for lemma, forms in Datasheet.load("adj-fr.csv"):
-    for form in forms.split(","):
-        if lemma in sentiment:
-            sentiment[form] = sentiment[lemma]
+# The lexicon is a dictionary of adjective => score.
+# The score of each lemma (e.g., parfait = +1.0) is the average score of the annotators,
+# inherited by each inflected form (parfaite = +1.0, parfaites = +1.0).
+# Parsing the .csv files takes a while. If you run "python lexicon.py" first,
+# the lexicon is loaded from a compiled file instead (until the .csv files change).
+# With FOLD = True, each form is also a key without accents (see tokenizer.py),
+# so that "genial" and "decevant" are found too.
+# The compiled lexicon already has these keys (see lexicon.compile()).
+FOLD = True
 
-def positive(review, threshold=0.0):
-    """ Returns True if the given review is positive,
-        based on the average sentiment score of the adjectives in the text.
+def _folded(table):
+    if isinstance(table, lexicon.Lexicon):
+        return table
+    return FOLD and folded(table) or table
+
+sentiment = _folded(lexicon.load(fold=FOLD))
+
+def score(review):
+    """ Returns the average sentiment score of the adjectives in the given string.
     """
+    table = sentiment # The lexicon may be replaced while we are scoring (see watch()).
+    # One lookup per word: None if the word is not in the lexicon.
+    # The compiled lexicon has a faster lookup() with a cache (see lexicon.Lexicon).
+    get = getattr(table, "lookup", table.get)
     score = 0.0
     n = 0
-    for w in review.replace("\n", " ").split(" "):
-        w = w.lower()
-        w = w.strip(",.!?")
-        if w in sentiment:
-            score += sentiment[w]
+    for w in words(review):
+        v = get(w)
+        if v is not None:
+            score += v
             n += 1
-    return score / (n or 1) > threshold
-    
-print positive("tres bon!")
-print positive("tres mal!")
\ No newline at end of file
+    return score / (n or 1)
+
+def positive(review, threshold=0.0):
+    """ Returns True if the given review is positive,
+        based on the average sentiment score of the adjectives in the text.
+    """
+    return score(review) > threshold
+
+# To score a large batch of reviews, we can avoid most of the Python overhead.
+# Each word in the lexicon gets a column number, and its score is stored in a vector.
+# A batch of reviews is then a sparse matrix with a row per review,
+# and the average scores are a single matrix-vector product.
+# The columns are only set up for the first batch, so importing this stays fast.
+
+# Most of the time goes to splitting the text and looking up words.
+# The tokens from words() are lowercase, so they can be looked up as they are.
+# The columns are a dictionary of word => column number + 1,
+# so that map(columns.get, tokens) is None for words that are not in the lexicon,
+# and filter() removes them. Both run in C.
+
+# The lexicon, columns and vector are kept together in one tuple.
+# If the lexicon is replaced (see watch()), a new tuple is built for the next batch,
+# while a batch that is being scored keeps using the old one.
+_index = (None, {}, array([]))
+
+def index():
+    """ Returns a (lexicon, columns, vector)-tuple for the current lexicon,
+        with a column number + 1 for each word in the lexicon.
+    """
+    global _index
+    table = sentiment
+    if _index[0] is not table:
+        a = list(table.keys())
+        _index = (table, dict((w, i + 1) for i, w in enumerate(a)), array([table[w] for w in a]))
+    return _index
+
+def vectorize(reviews, b=None):
+    """ Returns a sparse (CSR) matrix with a row for each review
+        and a column for each word in the lexicon.
+        Each occurrence of a word is stored as a separate 1.0 entry, in the order of the text,
+        so that the matrix-vector product adds up the scores in the same order as score().
+        The columns are those of the given index() tuple, by default the current one.
+    """
+    table, columns, vector = b or index()
+    get = columns.get
+    indices = []
+    indptr = [0]
+    n = [] # Number of words in each review.
+    for review in reviews:
+        w = words(review)
+        n.append(len(w))
+        indices.extend(filter(None, map(get, w)))
+        indptr.append(len(indices))
+    # The instrumentation is counted once for the batch, after the loop:
+    # count() and observe() take a lock, and calling them for each review made the batch slower.
+    if ENABLED:
+        count("tokens seen", sum(n))
+        count("lexicon misses", sum(n) - len(indices))
+        for v in n:
+            observe("review length (words)", v)
+    indices = array(indices, dtype=int) - 1
+    return csr_matrix((ones(len(indices)), indices, indptr), shape=(len(indptr) - 1, len(columns)))
+
+@timed("score")
+def score_batch(reviews, counts=False):
+    """ Returns an array with the average sentiment score for each given review.
+        With counts=True, returns a (scores, counts)-tuple,
+        where counts is an array with the number of adjectives found in each review.
+    """
+    b = index()
+    m = vectorize(reviews, b)
+    n = diff(m.indptr)
+    count("reviews scored", len(reviews))
+    count("lexicon hits", m.nnz)
+    v = m.dot(b[2]) / maximum(n, 1)
+    if counts:
+        return v, n
+    return v
+
+def positive_batch(reviews, threshold=0.0):
+    """ Returns a list with True for each given review that is positive.
+        The results are identical to positive() for each review.
+    """
+    return (score_batch(reviews) > threshold).tolist()
+
+# In a program that keeps running (e.g., service.py), call watch() once,
+# and new scores in the .csv files are used without restarting (see lexicon.Manager).
+manager = None
+
+def watch(interval=1.0, **kwargs):
+    """ Reloads the lexicon in the background when the .csv files change.
+        Returns the lexicon.Manager.
+    """
+    global manager, sentiment
+    if manager is None:
+        manager = lexicon.Manager(interval=interval, callback=_swap, **kwargs)
+        sentiment = _folded(manager.table)
+    return manager
+
+def _swap(table):
+    global sentiment
+    sentiment = _folded(table)
+
+if __name__ == "__main__":
+    print positive("tres bon!")
+    print positive("tres mal!")
@@ -0,0 +1,125 @@
+from pattern.db import Datasheet
+
+from numpy import array, zeros, ones, isnan, where, vstack, hstack, diag, outer, nan
+
+from lexicon import SHEET
+
+# INTER-ANNOTATOR AGREEMENT
+# =========================
+# 5-annotation.py used to compute Fleiss' kappa only on the adjectives that every annotator scored.
+# With more annotators, most adjectives have a blank somewhere, so most of the data was left out.
+
+# This module loads the sheet into a NumPy matrix (adjectives x annotators), with NaN for a blank,
+# and computes agreement over all adjectives that have at least two scores:
+# - Fleiss' kappa, with a different number of annotators per adjective,
+# - Krippendorff's alpha, which was designed for missing data.
+# Each score is a category: positive (+1), negative (-1) or neutral (0), as in 5-annotation.py.
+
+# Both only need the number of votes per category for each adjective (a matrix adjectives x categories).
+# A new annotator column adds one vote to each adjective it scored.
+# The Agreement class keeps the sums that kappa and alpha are made of,
+# and updates them only for the adjectives that got a new vote,
+# so a new column does not mean starting over.
+
+def load(path=SHEET):
+    """ Returns a (adjectives, matrix)-tuple, where matrix is a NumPy array
+        with a row for each adjective and a column for each annotator (NaN = blank).
+    """
+    words = []
+    scores = []
+    for row in Datasheet.load(path, headers=True):
+        words.append(row[0])
+        scores.append([float(x) if x != "" else nan for x in row[3:]])
+    m = max([len(row) for row in scores] or [0])
+    return words, array([row + [nan] * (m - len(row)) for row in scores], dtype=float).reshape(len(words), m)
+
+def sign(v):
+    """ Returns +1 for a positive score, -1 for a negative score, 0 for a neutral score.
+    """
+    return (v > 0) * 1 - (v < 0) * 1
+
+class Agreement(object):
+
+    def __init__(self, matrix=None, categories=(-1, 0, +1), category=sign):
+        """ Inter-annotator agreement for the given matrix (items x annotators, NaN = missing).
+            The category function maps an array of scores to the given categories.
+        """
+        self.categories = list(categories)
+        self.category = category
+        self.votes = zeros((0, len(self.categories))) # items x categories
+        self.annotators = 0
+        # The sums over all items with 2+ votes:
+        self._P = 0.0     # Sum of the observed agreement of each item (kappa).
+        self._items = 0   # Number of items.
+        self._T = zeros(len(self.categories))                          # Votes per category (kappa).
+        self._O = zeros((len(self.categories), len(self.categories)))  # Coincidence matrix (alpha).
+        if matrix is not None:
+            self.extend(matrix)
+
+    def _sums(self, votes, k=+1):
+        # Adds (k=+1) or subtracts (k=-1) the sums for the given rows of votes.
+        n = votes.sum(axis=1)
+        votes = votes[n >= 2]
+        n = n[n >= 2]
+        if len(n) == 0:
+            return
+        self._P += k * ((votes * (votes - 1)).sum(axis=1) / (n * (n - 1))).sum()
+        self._items += k * len(n)
+        self._T += k * votes.sum(axis=0)
+        w = votes / (n - 1)[:,None]
+        self._O += k * (w.T.dot(votes) - diag(w.sum(axis=0)))
+
+    def _votes(self, matrix):
+        # Returns the votes per category for the given matrix (items x annotators).
+        if len(matrix) > len(self.votes):
+            self.votes = vstack((self.votes, zeros((len(matrix) - len(self.votes), len(self.categories)))))
+        c = self.category(matrix)
+        return hstack([((c == x) & ~isnan(matrix)).sum(axis=1)[:,None] for x in self.categories]).astype(float)
+
+    def extend(self, matrix):
+        """ Adds the given annotator columns (items x annotators, NaN = missing).
+            The rows are the same items, in the same order; new items can be added at the end.
+        """
+        matrix = array(matrix, dtype=float).reshape(len(matrix), -1)
+        votes = self._votes(matrix)
+        i = where(votes.sum(axis=1) > 0)[0] # Only the items that got new votes are updated.
+        self._sums(self.votes[i], -1)
+        self.votes[i] += votes[i]
+        self._sums(self.votes[i], +1)
+        self.annotators += matrix.shape[1]
+
+    def append(self, column):
+        """ Adds the given annotator column (a score or NaN for each item).
+        """
+        self.extend(array(column, dtype=float).reshape(-1, 1))
+
+    def kappa(self):
+        """ Returns Fleiss' kappa (-1.0 to +1.0) over the items with 2+ votes,
+            where each item can have a different number of votes.
+        """
+        if not self._items:
+            return nan
+        p = self._T / self._T.sum()
+        P = self._P / self._items
+        Pe = (p * p).sum()
+        return (P - Pe) / (1 - Pe) if Pe < 1 else nan
+
+    def alpha(self, metric="nominal"):
+        """ Returns Krippendorff's alpha (-1.0 to +1.0) over the items with 2+ votes.
+            With metric="interval", the categories are numbers and larger differences count more
+            (e.g., positive vs. negative disagrees more than positive vs. neutral).
+            Returns NaN if there are no items with 2+ votes, or if all votes are the same category.
+        """
+        c = array(self.categories, dtype=float)
+        if metric == "interval":
+            d = (c[:,None] - c[None,:]) ** 2
+        else:
+            d = 1.0 - diag(ones(len(c)))
+        n = self._O.sum(axis=1)
+        De = (outer(n, n) * d).sum() / (n.sum() - 1) if self._items else 0.0
+        Do = (self._O * d).sum()
+        return 1.0 - Do / De if De > 0 else nan
+
+    def __repr__(self):
+        return "Agreement(items=%s, annotators=%s, kappa=%.2f, alpha=%.2f)" % (
+            self._items, self.annotators, self.kappa(), self.alpha())
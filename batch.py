@@ -0,0 +1,203 @@
+from multiprocessing import Pool, cpu_count
+from cStringIO import StringIO
+from codecs import BOM_UTF8
+from time import time
+
+import os
+import imp
+import csv
+import sys
+import json
+import argparse
+
+from corpus import rows, shards
+
+# BATCH SCORING
+# =============
+# 7-sentiment.py scores one text at a time, in one process.
+# To score millions of reviews (e.g., every night), this script scores a large .csv or .jsonl file
+# on all cores:
+#
+#    python batch.py reviews.csv scores.csv
+#
+# The input is divided into shards of about 64MB (byte ranges, see corpus.shards()).
+# Each shard is read and scored by a worker process, in batches (see score_batch()),
+# without loading the whole file into memory.
+# The lexicon is loaded once, before the workers are started, and shared with each of them.
+
+# Each shard is saved to its own part file (scores.csv.00000, scores.csv.00001, ...),
+# and when all shards are done, the parts are joined in order:
+# row i in the output is the score of row i in the input.
+# Each output row has the average score, the label (score > threshold) and the number of adjectives found.
+# If the job fails (or is stopped), run the same command again:
+# shards that were saved are not scored again.
+
+# In a .csv file, the text is the first field (or --column).
+# In a .jsonl file, each line is a string, a list (--column), or an object with a "text" field (--field).
+
+# 7-sentiment.py is not a valid module name, so we load it by path.
+sentiment = imp.load_source("sentiment", os.path.join(os.path.dirname(os.path.abspath(__file__)), "7-sentiment.py"))
+
+BATCH = 10000
+
+def jsonl(path, size=64*1024*1024):
+    """ Returns a list of (start, end) byte offsets that divide the given .jsonl file
+        into parts of about size bytes, each starting at the start of a line.
+    """
+    n = os.path.getsize(path)
+    f = open(path, "rb")
+    a = [0]
+    for i in range(size, n, size):
+        f.seek(max(i, a[-1]) - 1)
+        f.readline()
+        i = f.tell()
+        if a[-1] < i < n:
+            a.append(i)
+    f.close()
+    a.append(n)
+    return zip(a, a[1:])
+
+def texts(path, start=0, end=None, column=0, field="text"):
+    """ Yields the text of each row (.csv) or line (.jsonl) in the given byte range of the file.
+    """
+    if not path.endswith(".jsonl"):
+        for row in rows(path, start=start, end=end):
+            yield row[column]
+        return
+    f = open(path, "rb")
+    f.seek(start)
+    while end is None or f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        v = json.loads(line)
+        if isinstance(v, dict):
+            v = v.get(field, "")
+        if isinstance(v, list):
+            v = v[column]
+        yield v
+    f.close()
+
+# The options are shared with the worker processes (see crossval.py).
+_options = {}
+
+def _part(i):
+    return "%s.%05d" % (_options["output"], i)
+
+def _score(shard):
+    # Scores the texts in the given (i, start, end)-shard and saves the results in a part file.
+    # The part file is written under a temporary name and renamed when it is complete,
+    # so that a part file that exists is always complete.
+    i, start, end = shard
+    o = _options
+    t = time()
+    n = 0
+    f = open(_part(i) + ".tmp", "wb")
+    w = Writer(f, o["output"])
+    batch = []
+    for s in texts(o["input"], start, end, o["column"], o["field"]):
+        batch.append(s)
+        if len(batch) == BATCH:
+            w.write(*sentiment.score_batch(batch, counts=True))
+            n += len(batch)
+            batch = []
+    if batch:
+        w.write(*sentiment.score_batch(batch, counts=True))
+        n += len(batch)
+    f.close()
+    os.rename(_part(i) + ".tmp", _part(i))
+    return i, n, time() - t
+
+class Writer(object):
+
+    def __init__(self, f, path):
+        """ Writes (score, label, adjectives) rows to the given file,
+            as .jsonl if the path ends with .jsonl, otherwise as .csv.
+        """
+        self.f = f
+        self.jsonl = path.endswith(".jsonl")
+        self.threshold = _options.get("threshold", 0.0)
+        self.buffer = StringIO()
+        self.csv = csv.writer(self.buffer, quoting=csv.QUOTE_ALL, lineterminator="\r\n")
+
+    def write(self, scores, counts):
+        for v, n in zip(scores.tolist(), counts.tolist()):
+            if self.jsonl:
+                self.buffer.write(json.dumps({"score": v, "positive": v > self.threshold, "adjectives": n}) + "\n")
+            else:
+                self.csv.writerow((repr(v), v > self.threshold, n))
+        self.f.write(self.buffer.getvalue())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+def run(input, output, processes=None, size=64*1024*1024, threshold=0.0, column=0, field="text"):
+    """ Scores each text in the given .csv or .jsonl input file,
+        and saves the scores in the given output file (.csv or .jsonl), in the same order.
+    """
+    _options.update(input=input, output=output, threshold=threshold, column=column, field=field)
+    # The shards are saved in output.shards, so that a restarted job uses the same shards.
+    # If the input (or the shard size) changed, the old parts are removed.
+    plan = [os.path.getsize(input), os.path.getmtime(input), size]
+    try:
+        p = json.load(open(output + ".shards"))
+    except (IOError, ValueError):
+        p = None
+    if p is None or p["plan"] != plan:
+        a = input.endswith(".jsonl") and jsonl(input, size) or shards(input, size)
+        a = [(i, start, end) for i, (start, end) in enumerate(a)]
+        for i in range(len(p and p["shards"] or [])):
+            if os.path.exists(_part(i)):
+                os.remove(_part(i))
+        f = open(output + ".shards", "w")
+        json.dump({"plan": plan, "shards": a}, f)
+        f.close()
+    else:
+        a = [tuple(shard) for shard in p["shards"]]
+    todo = [shard for shard in a if not os.path.exists(_part(shard[0]))]
+    print "%s shards, %s done" % (len(a), len(a) - len(todo))
+    # Set up the lexicon and its columns before the workers are started,
+    # so that each worker gets a copy without loading it again.
+    sentiment.index()
+    t = time()
+    n = 0
+    pool = Pool(processes or cpu_count())
+    try:
+        for i, m, s in pool.imap_unordered(_score, todo):
+            n += m
+            print "shard %s: %s reviews (%.1fs)" % (i, m, s)
+    finally:
+        pool.close()
+        pool.join()
+    t = time() - t
+    print "%s reviews in %.1fs (%.0f reviews/sec)" % (n, t, n / (t or 1e-9))
+    # Join the parts in order.
+    f = open(output + ".tmp", "wb")
+    if not output.endswith(".jsonl"):
+        f.write(BOM_UTF8)
+    for i, start, end in a:
+        part = open(_part(i), "rb")
+        while True:
+            s = part.read(1024 * 1024)
+            if not s:
+                break
+            f.write(s)
+        part.close()
+    f.close()
+    os.rename(output + ".tmp", output)
+    for i, start, end in a:
+        os.remove(_part(i))
+    os.remove(output + ".shards")
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Scores the sentiment of each text in a large .csv or .jsonl file.")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("-p", "--processes", type=int, default=None, help="number of processes (default: all cores)")
+    p.add_argument("-s", "--size", type=float, default=64, help="shard size in MB (default: 64)")
+    p.add_argument("-t", "--threshold", type=float, default=0.0, help="positive if score > threshold (default: 0.0)")
+    p.add_argument("-c", "--column", type=int, default=0, help="the field with the text (default: 0)")
+    p.add_argument("-f", "--field", default="text", help="the key with the text in .jsonl objects (default: text)")
+    o = p.parse_args()
+    run(o.input, o.output, o.processes, int(o.size * 1024 * 1024), o.threshold, o.column, o.field)
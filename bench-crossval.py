@@ -0,0 +1,49 @@
+from pattern.vector import SVM
+from pattern.metrics import test as evaluate
+
+from corpus import rows
+
+import crossval
+
+from random import Random
+from time import time
+
+import sys
+
+# BENCHMARK: CROSS-VALIDATION
+# ===========================
+# Compares SVM.test() to crossval.test(), which runs the folds in parallel,
+# on books-fr.test.csv (10-fold cross-validation),
+# and checks that crossval.test() has the same scores as the SVM gets from its own train().
+# Usage: python bench-crossval.py [number of processes]
+
+data = [(review, positive == "True") for review, positive in rows("books-fr.test.csv")]
+data = [(review.lower().split(" "), positive) for review, positive in data]
+
+processes = len(sys.argv) > 1 and int(sys.argv[1]) or None
+
+t = time()
+m1 = SVM.test(data, folds=10)
+t1 = time() - t
+
+t = time()
+m2 = crossval.test(SVM, data, folds=10, processes=processes, seed=0)
+t2 = time() - t
+
+# SVM.test() shuffles the documents at random, so we can't compare its scores to crossval.test().
+# Instead, we test the same folds as crossval.test(seed=0), one after another, like SVM.test() does:
+# train() and classify() get each list of words, and the SVM makes a Document from it itself.
+documents = list(data)
+Random(0).shuffle(documents)
+m3 = []
+for i, j in crossval.partition(len(documents), 10):
+    classifier = SVM()
+    for words, positive in documents[:i] + documents[j:]:
+        classifier.train(words, type=positive)
+    m3.append(evaluate(lambda words: classifier.classify(words), documents[i:j]))
+m3 = tuple(sum(v) / 10.0 for v in zip(*m3))
+
+print "SVM.test()      : %.1fs (A %.2f P %.2f R %.2f F1 %.2f)" % ((t1,) + tuple(m1))
+print "crossval.test() : %.1fs (A %.2f P %.2f R %.2f F1 %.2f)" % ((t2,) + tuple(m2))
+print "speedup: %.1fx" % (t1 / t2)
+print "same scores as SVM.train():", all(abs(x - y) < 1e-9 for x, y in zip(m2, m3))
@@ -0,0 +1,127 @@
+from pattern.web import DOM, plaintext
+
+from time import time
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import extract
+
+from pagecache import PageCache
+
+# BENCHMARK: HTML EXTRACTION + PAGE CACHE
+# =======================================
+# Compares the DOM code that 2-amazon.py used to the streaming extractor (see extract.py),
+# on the pages in fixtures/ (see serve-fixtures.py):
+# - the time to parse each page (ms),
+# - the peak memory (max. RSS) of a process that parses a large review page (1,000 reviews),
+# - that both return the same book id's and reviews.
+# It also stores the pages of a crawl (1,000 books) in the page cache (see pagecache.py),
+# and compares its size to the size of the HTML.
+# Usage: python bench-extract.py [runs]
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LISTING = open(os.path.join(FIXTURES, "listing.html")).read().decode("utf-8")
+REVIEWS = open(os.path.join(FIXTURES, "reviews.html")).read().decode("utf-8")
+
+def dom_products(html):
+    # 2-amazon.py, with the DOM.
+    return [product.by_tag("a")[0].attributes["href"].split("/")[-2] for product in DOM(html).by_class("prod")]
+
+def dom_reviews(html):
+    # 2-amazon.py, with the DOM.
+    a = []
+    reviews = DOM(html).by_id("productReviews")
+    if reviews is not None:
+        for review in reviews.by_tag("div"):
+            try:
+                score = review.by_class("swSprite")[0]
+                score = score.attributes["title"]
+                score = score.split(" ")[0]
+                score = float(score)
+                text = ""
+                for child in review.children:
+                    if child.type == "text":
+                        text += child.source + " "
+                text = text.strip()
+                text = plaintext(text)
+                if text:
+                    a.append((text, score))
+            except Exception, e:
+                pass
+    return a
+
+def large(n=1000):
+    """ Returns a review page with n reviews.
+    """
+    i = REVIEWS.index('<a name="R1">')
+    j = REVIEWS.index("</td>")
+    return REVIEWS[:i] + REVIEWS[i:j] * (n / 3) + REVIEWS[j:]
+
+def speed(parse, pages, runs=10):
+    """ Returns the average time in ms to parse one of the given pages (the best of a number of runs).
+    """
+    t = min(_time(parse, pages) for i in range(runs))
+    return t / len(pages) * 1000
+
+def _time(parse, pages):
+    t = time()
+    for html in pages:
+        parse(html)
+    return time() - t
+
+def rss(method):
+    """ Returns the max. RSS in KB of a new Python process that parses a large review page
+        with the given method ("dom", "extract" or "none").
+    """
+    p = subprocess.Popen([sys.executable, __file__, "--rss", method])
+    pid, status, usage = os.wait4(p.pid, 0)
+    return usage.ru_maxrss
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--rss"]:
+        html = large()
+        {"dom": dom_reviews, "extract": extract.reviews, "none": len}[sys.argv[2]](html)
+        sys.exit(0)
+
+    runs = len(sys.argv) > 1 and int(sys.argv[1]) or 10
+
+    listings = [LISTING.replace("{page}", str(i)) for i in range(1, 46)]
+    reviews = [REVIEWS.replace("{id}", "%s%02d" % (i, j)) for i in range(1, 46) for j in range(1, 4)]
+
+    print "identical book id's :", all(dom_products(html) == extract.products(html) for html in listings)
+    print "identical reviews   :", all(dom_reviews(html) == extract.reviews(html) for html in reviews + [large()])
+    print
+    print "%-10s %16s %16s %16s" % ("", "listing (ms)", "reviews (ms)", "max. RSS (KB)")
+    m = rss("none")
+    print "%-10s %16.3f %16.3f %16s" % ("DOM", speed(dom_products, listings, runs), speed(dom_reviews, reviews, runs), rss("dom") - m)
+    print "%-10s %16.3f %16.3f %16s" % ("extract", speed(extract.products, listings, runs), speed(extract.reviews, reviews, runs), rss("extract") - m)
+    print "(max. RSS = more than a process that only makes the large page)"
+    print
+
+    # A crawl of 1,000 books: 334 overview pages and 1,000 review pages,
+    # where some books are listed twice (at different URLs) with the same page.
+    folder = tempfile.mkdtemp()
+    try:
+        cache = PageCache(os.path.join(folder, "pages.db"))
+        n = 0
+        for i in range(1, 335):
+            html = LISTING.replace("{page}", str(i))
+            cache.set("http://localhost:8000/s/ref=sr_pg_%s?page=%s" % (i, i), html)
+            n += len(html.encode("utf-8"))
+            for j in range(1, 4):
+                html = REVIEWS.replace("{id}", "%s%02d" % (i, j))
+                cache.set("http://localhost:8000/product-reviews/%s%02d/" % (i, j), html)
+                cache.set("http://localhost:8000/product-reviews/%s%02d/?ref=dp" % (i, j), html)
+                n += len(html.encode("utf-8")) * 2
+        urls, pages, size = cache.footprint()
+        cache.close()
+        print "page cache: %s URLs, %s pages, %.1f KB HTML => %.1f KB compressed (%.1f KB on disk)" % (
+            urls, pages, n / 1024.0, size / 1024.0, os.path.getsize(os.path.join(folder, "pages.db")) / 1024.0)
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,64 @@
+from pattern.db import Datasheet
+
+from frequency import count
+from synthetic import reviews
+
+from time import time
+
+import sys
+
+# BENCHMARK: ADJECTIVE FREQUENCY
+# ==============================
+# Compares the nested loop from the old 6-frequency.py
+# to the single-pass counter in frequency.py,
+# on books-fr.csv and on a synthetic corpus of 1M reviews.
+# Usage: python bench-frequency.py [number of synthetic reviews]
+
+def nested(data, lexicon):
+    """ The original 6-frequency.py loop: lemmas x reviews x forms.
+    """
+    counts = []
+    for lemma, forms in lexicon:
+        pos = 0
+        neg = 0
+        for review, score in data:
+            review = " " + review.lower() + " "
+            review = review.replace("!", " ")
+            review = review.replace(".", " ")
+            review = review.replace(",", " ")
+            for form in forms.split(","):
+                form = " " + form + " "
+                if score == 5:
+                    pos += review.count(form)
+                if score == 1:
+                    neg += review.count(form)
+        counts.append((lemma, [pos, neg, 0]))
+    return counts
+
+def benchmark(name, data, lexicon, sample=None):
+    """ Prints the running time of both approaches on the given data.
+        With sample=n, the nested loop only runs for the top n lemmas
+        and its running time is extrapolated to 2000 lemmas.
+    """
+    t = time()
+    count(data, lexicon)
+    t1 = time() - t
+    t = time()
+    nested(data, lexicon[:sample or 2000])
+    t2 = (time() - t) * 2000.0 / (sample or 2000)
+    print name, "(%s reviews)" % len(data)
+    print "nested loop, top 2000 lemmas: %.1fs%s" % (t2, sample and " (extrapolated)" or "")
+    print "single pass, %s lemmas: %.1fs" % (len(lexicon), t1)
+    print "speedup: %.0fx" % (t2 / (t1 or 0.001))
+    print
+
+lexicon = [tuple(row) for row in Datasheet.load("adj-fr.csv")]
+
+data = Datasheet.load("books-fr.csv")
+data.columns[1].map(lambda v: float(v))
+data = [tuple(row) for row in data]
+benchmark("books-fr.csv", data, lexicon)
+
+n = len(sys.argv) > 1 and int(sys.argv[1]) or 1000000
+data = list(reviews(n, lexicon, length=60)) # See synthetic.py.
+benchmark("synthetic", data, lexicon, sample=10)
@@ -0,0 +1,45 @@
+from time import time
+
+import os
+import sys
+import subprocess
+
+import lexicon
+
+# BENCHMARK: LEXICON STARTUP
+# ==========================
+# Compares the cold-start time and memory (max. RSS) of a process
+# that loads the lexicon from the .csv files, to one that memory-maps the compiled file.
+# Each variant runs in a fresh Python process, a number of times.
+# Usage: python bench-lexicon.py [runs]
+
+CSV = "import lexicon; s = lexicon.load_csv(); s.get(u'bon')"
+BIN = "import lexicon; s = lexicon.Lexicon(); s.get(u'bon')"
+NOP = "import lexicon"
+
+def run(code, runs=10):
+    """ Returns the (average time in seconds, max. RSS in KB)
+        of running the given code in a new Python process.
+    """
+    t = 0.0
+    m = 0
+    for i in range(runs):
+        t0 = time()
+        p = subprocess.Popen([sys.executable, "-c", code])
+        pid, status, usage = os.wait4(p.pid, 0)
+        t += time() - t0
+        m = max(m, usage.ru_maxrss)
+    return t / runs, m
+
+lexicon.compile()
+
+runs = len(sys.argv) > 1 and int(sys.argv[1]) or 10
+
+t0, m0 = run(NOP, runs)
+t1, m1 = run(CSV, runs)
+t2, m2 = run(BIN, runs)
+
+print "%s words, %s bytes compiled" % (len(lexicon.Lexicon()), os.path.getsize(lexicon.COMPILED))
+print "python + imports : %.3fs, %s KB" % (t0, m0)
+print ".csv files       : %.3fs, %s KB" % (t1, m1)
+print "compiled (mmap)  : %.3fs, %s KB" % (t2, m2)
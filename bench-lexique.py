@@ -0,0 +1,64 @@
+from time import time
+
+import os
+import sys
+import subprocess
+
+# BENCHMARK: LEXIQUE INGESTION
+# ============================
+# Compares the wall-clock time and peak memory (max. RSS) of reading Lexique
+# with Datasheet.load() (the old 1-lexique.py), to the streaming reader in lexique.py.
+# To see how both behave on a bigger resource,
+# the file can be repeated a number of times into a larger copy first.
+# Both read the same word classes (by default only ADJ, like 1-lexique.py),
+# so they do the same work, apart from how the file is read.
+# Usage: python bench-lexique.py [path] [repeat] [tags, e.g. ADJ,NOM,VER]
+
+DATASHEET = """
+from pattern.db import Datasheet
+lexicon = dict((tag, {}) for tag in %r)
+for row in Datasheet.load(%r, separator="\\t"):
+    form, lemma, tag, weight = row[0], row[2], row[3], row[7]
+    if tag in lexicon:
+        if lemma not in lexicon[tag]:
+            lexicon[tag][lemma] = [0, []]
+        lexicon[tag][lemma][0] = float(weight)
+        lexicon[tag][lemma][1].append(form)
+"""
+
+STREAMING = """
+from lexique import rows, lexicons
+lexicon = lexicons(rows(%r, separator="\\t"), tags=%r)
+"""
+
+def run(code):
+    """ Returns the (time in seconds, max. RSS in KB) of running the given code in a new Python process.
+    """
+    t = time()
+    p = subprocess.Popen([sys.executable, "-c", code])
+    pid, status, usage = os.wait4(p.pid, 0)
+    return time() - t, usage.ru_maxrss
+
+path = len(sys.argv) > 1 and sys.argv[1] or "Lexique380/Bases+Scripts/Lexique380.txt"
+k = len(sys.argv) > 2 and int(sys.argv[2]) or 1
+tags = tuple(len(sys.argv) > 3 and sys.argv[3].split(",") or ("ADJ",))
+
+if k > 1:
+    f = open(path, "rb")
+    header = f.readline()
+    body = f.read()
+    f.close()
+    path = "lexique-x%s.txt" % k
+    f = open(path, "wb")
+    f.write(header)
+    for i in range(k):
+        f.write(body)
+    f.close()
+
+print "%s (%.1f MB)" % (path, os.path.getsize(path) / 1024.0 / 1024)
+print "tags:", " + ".join(tags)
+print "Datasheet.load()    : %.1fs, %s KB" % run(DATASHEET % (tags, path))
+print "lexique.rows()      : %.1fs, %s KB" % run(STREAMING % (path, tags))
+
+if k > 1:
+    os.remove(path)
@@ -0,0 +1,115 @@
+from pattern.db import Datasheet
+
+from threading import Thread
+from random import Random
+from time import time, sleep
+
+import os
+import imp
+import sys
+import shutil
+import tempfile
+
+import lexicon
+
+# BENCHMARK: LEXICON HOT RELOAD
+# =============================
+# Scores reviews with positive() in a thread, while the lexicon is reloaded in the background.
+# The .csv files are copied to a temporary folder, and then changed twice:
+# 1) a new annotator column with scores for n adjectives is added to the sheet,
+# 2) a new inflected form is added to n adjectives in adj-fr.csv.
+# For each change, it reports:
+# - the reload latency (from saving the file until the new table is used),
+# - the time of the reload itself, compared to loading everything with load_csv(),
+# - the throughput of positive() (reviews/sec) before, during and after the reload,
+# and checks that the reloaded table is identical to load_csv().
+# Usage: python bench-reload.py [number of changed adjectives]
+
+# 7-sentiment.py is not a valid module name, so we load it by path.
+sentiment = imp.load_source("sentiment", "7-sentiment.py")
+
+n = len(sys.argv) > 1 and int(sys.argv[1]) or 100
+
+folder = tempfile.mkdtemp()
+sheet = os.path.join(folder, "sheet.csv")
+adjectives = os.path.join(folder, "adj-fr.csv")
+shutil.copy(lexicon.SHEET, sheet)
+shutil.copy(lexicon.ADJECTIVES, adjectives)
+
+manager = sentiment.watch(interval=0.01, sheet=sheet, adjectives=adjectives)
+
+reviews = [review for review, score in Datasheet.load("books-fr.csv")]
+
+# The scoring thread records the time after every 100 reviews.
+ticks = []
+done = []
+
+def score():
+    i = 0
+    while not done:
+        for review in reviews[i:i+100]:
+            sentiment.positive(review)
+        i = (i + 100) % len(reviews)
+        ticks.append(time())
+
+def throughput(t0, t1):
+    """ Returns the number of reviews/sec scored between t0 and t1.
+    """
+    return 100 * sum(1 for t in ticks if t0 <= t < t1) / max(t1 - t0, 1e-9)
+
+def save(rows, path):
+    # Saving to a temporary file and renaming it is what a careful editor does.
+    # The Manager would also cope with a half-written file (it retries on the next change).
+    Datasheet(rows).save(path + ".tmp")
+    os.rename(path + ".tmp", path)
+
+def change(rows, path):
+    """ Saves the given rows to the given path, waits for the reload,
+        and prints the latency and throughput.
+    """
+    sleep(1.0)
+    r = manager.reloads
+    t0 = time()
+    save(rows, path)
+    while manager.reloads == r:
+        sleep(0.001)
+    t1 = time()
+    sleep(1.0)
+    t = time()
+    load_csv = lexicon.load_csv(sheet, adjectives)
+    t = time() - t
+    print "reload latency   : %.3fs (detection + reload)" % (t1 - t0)
+    print "reload           : %.3fs" % manager.latency
+    print "load_csv()       : %.3fs" % t
+    print "before reload    : %.0f reviews/sec" % throughput(t0 - 1.0, t0)
+    print "during reload    : %.0f reviews/sec" % throughput(t0, t1)
+    print "after reload     : %.0f reviews/sec" % throughput(t1, t1 + 1.0)
+    print "identical        :", manager.table == load_csv
+    print
+
+thread = Thread(target=score)
+thread.start()
+
+r = Random(0)
+
+# 1) A new annotator.
+rows = [list(row) for row in Datasheet.load(sheet)]
+rows[0].append("NEW")
+for row in rows[1:]:
+    row.append("")
+for row in r.sample(rows[1:], n):
+    row[-1] = r.choice(["-1.0", "-0.6", "-0.3", "0.0", "+0.3", "+0.6", "+1.0"])
+print "%s new scores in the sheet:" % n
+change(rows, sheet)
+
+# 2) New inflected forms.
+rows = [list(row) for row in Datasheet.load(adjectives)]
+for row in r.sample(rows, n):
+    row[1] += "," + row[0] + "x"
+print "%s new forms in adj-fr.csv:" % n
+change(rows, adjectives)
+
+done.append(True)
+thread.join()
+manager.stop()
+shutil.rmtree(folder)
@@ -0,0 +1,40 @@
+from pattern.db import Datasheet
+
+from time import time
+
+import imp
+import sys
+
+import instrument
+
+# BENCHMARK: LEXICON SCORING
+# ==========================
+# Compares positive() for each review to positive_batch() for a batch of reviews,
+# in reviews/sec, and checks that both return the same results.
+# With INSTRUMENT=1, both paths also update the counters (see instrument.py), so compare runs with the same setting.
+# Usage: python bench-sentiment.py [number of reviews] [batch size]
+
+# 7-sentiment.py is not a valid module name, so we load it by path.
+sentiment = imp.load_source("sentiment", "7-sentiment.py")
+
+n = len(sys.argv) > 1 and int(sys.argv[1]) or 100000
+b = len(sys.argv) > 2 and int(sys.argv[2]) or 10000
+
+reviews = [review for review, score in Datasheet.load("books-fr.csv")]
+reviews = (reviews * (n / len(reviews) + 1))[:n]
+
+t = time()
+p1 = [sentiment.positive(review) for review in reviews]
+t1 = time() - t
+
+t = time()
+p2 = []
+for i in range(0, n, b):
+    p2.extend(sentiment.positive_batch(reviews[i:i+b]))
+t2 = time() - t
+
+print "reviews:", n
+print "instrumented:", instrument.ENABLED
+print "positive()       : %.0f reviews/sec" % (n / t1)
+print "positive_batch() : %.0f reviews/sec (batch size %s)" % (n / t2, b)
+print "identical:", p1 == p2
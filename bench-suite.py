@@ -0,0 +1,224 @@
+from pattern.db import Datasheet
+
+from datetime import datetime
+from math import log
+from time import time
+
+import os
+import imp
+import sys
+import json
+import platform
+import subprocess
+
+# BENCHMARK SUITE
+# ===============
+# Runs the main steps of the workshop on synthetic corpora of 10K, 100K, 1M (and 10M) reviews
+# (see synthetic.py), and records for each step and corpus size:
+# - the running time and throughput (reviews/sec),
+# - the peak memory (max. RSS) of the process.
+# Each step runs in a fresh Python process, so that the memory of one step doesn't count for the next.
+# The results of each run are appended to bench-results.json, so that you can compare them
+# to the previous run (e.g., before and after you changed something).
+# The scaling exponent shows how the time grows with the size of the corpus:
+# 1.0 = linear (10x more reviews takes 10x longer), 2.0 = quadratic (10x more takes 100x longer).
+
+# The synthetic corpora are saved as synthetic-<size>.csv and reused in the next run.
+# Usage: python bench-suite.py [max. size] [step ...]
+# For example: python bench-suite.py 10000000 score frequency
+
+SIZES = [10000, 100000, 1000000, 10000000]
+RESULTS = "bench-results.json"
+
+# The steps run the same functions and classes as the scripts, reading the corpus from a file.
+# The SVM is only cross-validated on the first SVM_MAX reviews,
+# because training time grows faster than linear.
+# The online classifier (see online.py) is trained on all reviews.
+SVM_MAX = 20000
+
+def align(path):
+    # 3-aligned.py: distribution of star ratings + a sample of m reviews per class, in one pass.
+    from corpus import rows
+    from sampling import Stratified, BINARY
+    n = 0
+    distribution = {}
+    sample = Stratified(BINARY, k=500, seed=0)
+    for review, score in rows(path):
+        score = float(score)
+        distribution[score] = distribution.get(score, 0) + 1
+        n += 1
+        sample.add(review, score)
+    sample.aligned()
+    return n
+
+def normalize(path):
+    # 4-svm.py: the adjectives in each review (without the token cache,
+    # which would make every run after the first one measure tokens.db).
+    from corpus import rows
+    from preprocess import adjectives, normalize
+    a = adjectives("adj-fr.csv")
+    n = 0
+    for review, score in rows(path):
+        normalize(review, a)
+        n += 1
+    return n
+
+def _data(path, n=None):
+    # Returns a list of (adjectives, positive)-tuples for the first n reviews that are not neutral.
+    from corpus import rows
+    from preprocess import adjectives, normalize
+    a = adjectives("adj-fr.csv")
+    data = []
+    for review, score in rows(path):
+        if float(score) != 3:
+            data.append((normalize(review, a), float(score) > 3))
+        if len(data) == n:
+            break
+    return data
+
+def svm(path):
+    # 4-svm.py: 10-fold cross-validation of the SVM on the (normalized) reviews, in parallel.
+    from pattern.vector import SVM
+    import crossval
+    data = _data(path, SVM_MAX)
+    crossval.test(SVM, data, folds=10)
+    return len(data)
+
+def online(path):
+    # online.py: the same data as svm(), on all reviews, in batches of 1,000,
+    # each batch classified first and then trained (memory doesn't grow with the corpus).
+    from online import Online
+    from corpus import rows
+    from preprocess import adjectives, normalize
+    a = adjectives("adj-fr.csv")
+    classifier = Online()
+    n = 0
+    batch = []
+    for review, score in rows(path):
+        if float(score) != 3:
+            batch.append((normalize(review, a), float(score) > 3))
+            n += 1
+        if len(batch) == 1000:
+            [classifier.classify(review) for review, positive in batch]
+            classifier.update(batch)
+            batch = []
+    classifier.update(batch)
+    return n
+
+def score(path):
+    # 7-sentiment.py: positive_batch() for batches of 10,000 reviews.
+    from corpus import rows
+    sentiment = imp.load_source("sentiment", "7-sentiment.py")
+    n = 0
+    batch = []
+    for review, score in rows(path):
+        batch.append(review)
+        if len(batch) == 10000:
+            sentiment.positive_batch(batch)
+            n += len(batch)
+            batch = []
+    sentiment.positive_batch(batch)
+    return n + len(batch)
+
+def frequency(path):
+    # 6-frequency.py: the number of times each adjective occurs in 5-star and 1-star reviews.
+    from corpus import rows
+    from frequency import count
+    n = [0]
+    def data():
+        for review, score in rows(path):
+            n[0] += 1
+            yield review, score
+    count(data(), Datasheet.load("adj-fr.csv"))
+    return n[0]
+
+STEPS = [
+    ("align", align),
+    ("normalize", normalize),
+    ("svm", svm),
+    ("online", online),
+    ("score", score),
+    ("frequency", frequency)
+]
+
+def run(step, path):
+    """ Returns a (number of reviews, time in seconds, max. RSS in KB)-tuple
+        for the given step on the given corpus, in a new Python process.
+    """
+    p = subprocess.Popen([sys.executable, __file__, "--step", step, path], stdout=subprocess.PIPE)
+    output = p.stdout.read()
+    pid, status, usage = os.wait4(p.pid, 0)
+    if status != 0:
+        raise RuntimeError("%s failed on %s" % (step, path))
+    n, t = json.loads(output)
+    return n, t, usage.ru_maxrss
+
+def corpus(n):
+    """ Returns the path of a synthetic corpus with n reviews (generated once).
+    """
+    path = "synthetic-%s.csv" % n
+    if not os.path.exists(path):
+        from synthetic import save
+        t = time()
+        save(path, n)
+        print "generated %s (%.1fs)" % (path, time() - t)
+    return path
+
+def previous(path=RESULTS):
+    """ Returns the most recent result for each step and size, as a dict of (step, size) => result.
+    """
+    if not os.path.exists(path):
+        return {}
+    return dict(((r["step"], r["size"]), r) for run in json.load(open(path)) for r in run["results"])
+
+def save(results, path=RESULTS):
+    """ Appends the given list of results to the given .json file, with a timestamp and platform info.
+    """
+    runs = os.path.exists(path) and json.load(open(path)) or []
+    runs.append({
+           "date": datetime.now().isoformat(),
+         "python": platform.python_version(),
+       "platform": platform.platform(),
+        "results": results
+    })
+    f = open(path + ".tmp", "w")
+    json.dump(runs, f, indent=1)
+    f.close()
+    os.rename(path + ".tmp", path)
+
+if __name__ == "__main__":
+    # Called by run() in a new process: print (number of reviews, time) as JSON.
+    if sys.argv[1:2] == ["--step"]:
+        t = time()
+        n = dict(STEPS)[sys.argv[2]](sys.argv[3])
+        print json.dumps((n, time() - t))
+        sys.exit(0)
+
+    m = len(sys.argv) > 1 and int(sys.argv[1]) or 1000000
+    steps = sys.argv[2:] or [name for name, f in STEPS]
+
+    before = previous()
+    results = []
+    print "%-10s %10s %10s %14s %12s %8s %8s" % ("step", "reviews", "time", "reviews/sec", "max RSS", "scaling", "change")
+    for name in steps:
+        t0 = n0 = None
+        for size in [size for size in SIZES if size <= m]:
+            n, t, rss = run(name, corpus(size))
+            results.append({
+                      "step": name,
+                      "size": size,
+                   "reviews": n,
+                   "seconds": t,
+               "reviews/sec": n / (t or 1e-9),
+                  "RSS (KB)": rss
+            })
+            # Scaling exponent, compared to the previous size.
+            e = t0 and n != n0 and log(t / t0) / log(float(n) / n0)
+            # Change in time, compared to the previous run.
+            r = before.get((name, size))
+            r = r and "%+.0f%%" % (100 * (t - r["seconds"]) / (r["seconds"] or 1e-9)) or ""
+            print "%-10s %10s %9.2fs %14.0f %9s KB %8s %8s" % (
+                name, n, t, n / (t or 1e-9), rss, e and "%.2f" % e or "", r)
+            t0, n0 = t, n
+    save(results)
+    print "results saved to %s" % RESULTS
@@ -0,0 +1,65 @@
+from pattern.db import Datasheet
+
+from time import time
+
+import sys
+
+from corpus import rows
+from tokenizer import words, folded
+
+# BENCHMARK: TOKENIZER
+# ====================
+# Compares the old split/strip/lower tokenizer to tokenizer.words(), on books-fr.csv,
+# in tokens/sec, and the lexicon hit rate (= % of tokens that are an adjective in adj-fr.csv),
+# with and without the accent-folded keys (see tokenizer.py).
+# Usage: python bench-tokenizer.py [runs]
+
+def split(s):
+    # The old tokenizer (preprocess.py, 7-sentiment.py).
+    return [w.strip(",.!?") for w in s.replace("\n", " ").lower().split(" ")]
+
+runs = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+
+reviews = [review for review, score in rows("books-fr.csv")]
+
+adjectives = {}
+for lemma, forms in Datasheet.load("adj-fr.csv"):
+    for form in forms.split(","):
+        adjectives[form] = form
+
+def speed(tokenize):
+    """ Returns the number of tokens/sec for the given tokenizer (the best of a number of runs).
+    """
+    t = min(_time(tokenize) for i in range(runs))
+    return sum(len(tokenize(review)) for review in reviews) / t
+
+def _time(tokenize):
+    t = time()
+    for review in reviews:
+        tokenize(review)
+    return time() - t
+
+def hits(tokenize, lexicon):
+    """ Returns a (tokens, hits)-tuple for the given tokenizer and lexicon.
+    """
+    n = 0
+    m = 0
+    for review in reviews:
+        a = tokenize(review)
+        n += len(a)
+        m += sum(1 for w in a if w in lexicon)
+    return n, m
+
+t = time()
+f = folded(adjectives)
+t = time() - t
+
+print "%s reviews, %s forms (%s without accents, in %.3fs)" % (len(reviews), len(adjectives), len(f) - len(adjectives), t)
+print
+print "%-26s %12s %10s %10s %8s" % ("", "tokens/sec", "tokens", "hits", "hit %")
+for name, tokenize, lexicon in (
+  ("split/strip/lower", split, adjectives),
+  ("words()", words, adjectives),
+  ("words() + folded()", words, f)):
+    n, m = hits(tokenize, lexicon)
+    print "%-26s %12.0f %10s %10s %7.1f%%" % (name, speed(tokenize), n, m, m * 100.0 / (n or 1))
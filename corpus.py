@@ -0,0 +1,230 @@
+from codecs import BOM_UTF8
+from cStringIO import StringIO
+
+from instrument import count
+
+import os
+import csv
+import warnings
+
+# APPEND-ONLY CORPUS
+# ==================
+# 2-amazon.py used to call corpus.save("books-fr.csv") after each book,
+# writing the whole (growing) corpus to disk again and again.
+# The total cost is quadratic: 5,000 reviews are written 5,000 / 10 times.
+
+# CorpusWriter appends each new row to the end of the file instead,
+# so the cost of writing is proportional to the number of new rows.
+# Rows are buffered and flushed to disk (fsync) every n rows, and when the writer is closed.
+# The file has the same format as Datasheet.save() (UTF-8, BOM, quoted fields),
+# so Datasheet.load() can still read it.
+
+# The rows() function reads the file back one row at a time,
+# so scripts like 3-aligned.py don't need to load the whole corpus into memory.
+
+# If the crawler crashes while writing, the last row in the file may be incomplete.
+# Complete rows always end with a line break.
+# rows() warns about an incomplete last row (or raises PartialRecord with strict=True),
+# and CorpusWriter removes it before appending new rows.
+
+class PartialRecord(Exception):
+    pass
+
+class PartialRecordWarning(UserWarning):
+    pass
+
+def _encode(v):
+    # Fields are saved as UTF-8 strings.
+    # Line breaks in a field are saved as "\n", so that "\r\n" only occurs at the end of a row.
+    if isinstance(v, unicode):
+        v = v.encode("utf-8")
+    if isinstance(v, str):
+        v = v.replace("\r\n", "\n").replace("\r", "\n")
+    return v
+
+def _parse(record, separator=","):
+    # Returns the given line(s) of a .csv file as a list of Unicode fields.
+    row = csv.reader(record.splitlines(True), delimiter=separator).next()
+    return [v.decode("utf-8") for v in row]
+
+def _complete(record, fields=None, separator=","):
+    # Returns True if the given record (without line break) is a complete row:
+    # all quotes are closed and it has the expected number of fields.
+    # Datasheet.save() does not add a line break at the end of the file,
+    # so this is how we tell its last row apart from a row cut off by a crash.
+    if not record.endswith('"') or record.count('"') % 2:
+        return False
+    try:
+        return fields is None or len(_parse(record, separator)) == fields
+    except csv.Error:
+        return False
+
+def rows(path, separator=",", fields=None, strict=False, start=0, end=None):
+    """ Yields each row in the given .csv file as a list of Unicode fields,
+        reading one line at a time.
+        An incomplete last row (e.g., after a crash) is not yielded.
+        Instead, a PartialRecordWarning is issued (or PartialRecord is raised if strict=True).
+        By default, the number of fields is that of the first row.
+        With start and end, only the rows from byte offset start up to end are read;
+        both must be offsets where a row starts (see shards()).
+    """
+    f = open(path, "rb")
+    f.seek(start)
+    offset = start
+    record = ""
+    while end is None or offset < end or record:
+        line = f.readline()
+        if not line:
+            break
+        if offset == 0:
+            line = line.lstrip(BOM_UTF8)
+        offset = f.tell()
+        record += line
+        if record.count('"') % 2:
+            continue # Line break inside a quoted field.
+        if not record.strip():
+            record = ""
+            continue
+        if not record.endswith("\n") and not _complete(record, fields, separator):
+            break
+        row = _parse(record, separator)
+        if fields is None:
+            fields = len(row)
+        record = ""
+        count("rows read")
+        yield row
+    f.close()
+    if record:
+        if strict:
+            raise PartialRecord("incomplete last row in %s" % path)
+        warnings.warn("incomplete last row in %s" % path, PartialRecordWarning)
+
+# To read a large file in parallel, we divide it into parts (shards) of n bytes,
+# and then move the start of each part to the start of the next row.
+# A row can span several lines, so where does the next row start?
+# Each field is quoted (see CorpusWriter), and a quote inside a field is escaped as "".
+# After a closing quote comes a separator or the end of the row.
+# So if a line ends with an odd number of quotes (= a closing quote)
+# that do not follow a separator (= an opening quote), the next line starts a new row.
+# Some rows are not recognized (e.g., if the last field ends with a comma),
+# in which case we move on to the next row. Both readers of a shard agree on where it starts.
+
+def _closed(line, separator=","):
+    # Returns True if the given line ends with a closing quote.
+    s = line[:-2] if line.endswith("\r\n") else line[:-1]
+    n = len(s) - len(s.rstrip('"'))
+    return n % 2 == 1 and len(s) > n and s[-n-1] not in (separator, "\n")
+
+def _next(f, offset, separator=","):
+    # Returns the offset of the first row that starts at or after the given offset.
+    i = max(0, offset - 1024)
+    f.seek(i)
+    prev = f.read(offset - i)
+    if not prev.endswith("\n"):
+        prev += f.readline() # Skip the rest of the line.
+        offset = f.tell()
+    if i == 0:
+        prev = prev.lstrip(BOM_UTF8)
+    while True:
+        if _closed(prev, separator):
+            return offset
+        line = f.readline()
+        if not line:
+            return offset
+        prev = line
+        offset += len(line)
+
+def shards(path, size=64*1024*1024, separator=","):
+    """ Returns a list of (start, end) byte offsets that divide the given .csv file
+        into parts of about size bytes, each starting at the start of a row.
+        The parts can be read in parallel with rows(path, start=start, end=end).
+    """
+    n = os.path.getsize(path)
+    f = open(path, "rb")
+    a = [0]
+    for i in range(size, n, size):
+        i = _next(f, max(i, a[-1]), separator)
+        if a[-1] < i < n:
+            a.append(i)
+    f.close()
+    a.append(n)
+    return zip(a, a[1:])
+
+def _tail(path):
+    # Returns the (offset, bytes) after the last "\r\n" in the given file.
+    f = open(path, "rb")
+    f.seek(0, 2)
+    i = j = f.tell()
+    tail = ""
+    while i > 0:
+        i = max(0, i - 65536)
+        f.seek(i)
+        tail = f.read(j - i) + tail
+        j = i
+        if "\r\n" in tail:
+            break
+    f.close()
+    k = tail.rfind("\r\n")
+    k = k >= 0 and k + 2 or 0
+    return j + k, tail[k:]
+
+class CorpusWriter(object):
+
+    def __init__(self, path, separator=",", fields=None, fsync=1000):
+        """ Appends rows to the given .csv file.
+            The file is flushed to disk every fsync rows.
+            If the last row in the file is incomplete, it is removed.
+        """
+        self.path = path
+        self.separator = separator
+        self.fsync = fsync
+        self.rows = 0 # Number of rows appended.
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._f = open(path, "wb")
+            self._f.write(BOM_UTF8)
+        else:
+            if fields is None:
+                for row in rows(path, separator):
+                    fields = len(row) # Number of fields in the first row.
+                    break
+            i, tail = _tail(path)
+            self._f = open(path, "ab")
+            if tail.lstrip(BOM_UTF8).strip() == "":
+                pass
+            elif _complete(tail.lstrip(BOM_UTF8), fields, separator):
+                self._f.write("\r\n") # Last row saved with Datasheet.save().
+            else:
+                self._f.truncate(i or tail.startswith(BOM_UTF8) and len(BOM_UTF8)) # Last row cut off by a crash.
+        self._buffer = StringIO()
+        self._writer = csv.writer(self._buffer, delimiter=separator, quoting=csv.QUOTE_ALL, lineterminator="\r\n")
+
+    def append(self, row):
+        """ Appends the given list of fields as a new row.
+        """
+        self._writer.writerow([_encode(v) for v in row])
+        self._f.write(self._buffer.getvalue())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self.rows += 1
+        if self.rows % self.fsync == 0:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        """ Writes the buffered rows to disk.
+        """
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,220 @@
+from Queue import Queue
+from threading import Thread, Lock, Semaphore
+from urlparse import urlparse
+from random import random
+from time import time, sleep
+
+import os
+import sys
+import urllib2
+
+# CRAWLER
+# =======
+# 2-amazon.py used to download each page one after another,
+# waiting 20 seconds between each request (throttle=20).
+# A full crawl took hours, and if it crashed halfway we had to start over.
+
+# The Crawler class downloads pages with a pool of threads:
+# - at most n connections to the same host at the same time,
+# - at most r requests per second to the same host (token bucket),
+# - failed downloads are retried after 1, 2, 4, ... seconds,
+# - each queued and each finished URL is logged to a file (the frontier),
+#   so that an interrupted crawl continues where it stopped,
+#   and pages that failed (e.g., a timeout or 503) are tried again (3 times by default).
+# Each downloaded page is passed to a handler function,
+# which can return new URLs to crawl (e.g., links to review pages).
+
+class TokenBucket(object):
+
+    def __init__(self, rate=1.0, burst=1):
+        """ Allows rate requests per second on average, and at most burst requests at once.
+        """
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._t = time()
+        self._lock = Lock()
+
+    def wait(self):
+        """ Blocks until a request is allowed.
+        """
+        while True:
+            with self._lock:
+                t = time()
+                self._tokens = min(self.burst, self._tokens + (t - self._t) * self.rate)
+                self._t = t
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                d = (1 - self._tokens) / self.rate
+            sleep(d)
+
+class Frontier(object):
+
+    def __init__(self, path=None, attempts=3):
+        """ A queue of (url, kind)-tuples to crawl.
+            With a path, each queued URL is logged as "+ url kind",
+            each finished URL as "- url" (or "! url" if it failed).
+            If the log file exists, the URLs that were not finished are queued again,
+            and so are the URLs that failed (e.g., a timeout), up to the given number of attempts.
+        """
+        self.path = path
+        self.attempts = attempts
+        self.queue = Queue()
+        self.seen = set()
+        self.resumed = False
+        self._lock = Lock()
+        self._log = None
+        if path and os.path.exists(path):
+            self.resumed = True
+            queued = []
+            done = set()
+            failed = {} # url => number of failed attempts.
+            for line in open(path):
+                line = line.rstrip("\n").split("\t")
+                if line[0] == "+" and len(line) == 3:
+                    queued.append((line[1], line[2] or None))
+                if line[0] == "-" and len(line) == 2:
+                    done.add(line[1])
+                if line[0] == "!" and len(line) == 2:
+                    failed[line[1]] = failed.get(line[1], 0) + 1
+            for url, kind in queued:
+                if url not in self.seen:
+                    self.seen.add(url)
+                    if url not in done and failed.get(url, 0) < attempts:
+                        self.queue.put((url, kind))
+        if path:
+            self._log = open(path, "a")
+
+    def log(self, *fields):
+        if self._log:
+            with self._lock:
+                self._log.write("\t".join(fields) + "\n")
+                self._log.flush()
+
+    def push(self, url, kind=None):
+        """ Queues the given URL, unless it was queued before.
+        """
+        with self._lock:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+        self.log("+", url, kind or "")
+        self.queue.put((url, kind))
+        return True
+
+    def done(self, url, failed=False):
+        self.log(failed and "!" or "-", url)
+        self.queue.task_done()
+
+    def __len__(self):
+        return self.queue.qsize()
+
+def download(url):
+    """ Returns the HTML source at the given URL.
+    """
+    return urllib2.urlopen(url, timeout=30).read()
+
+class Crawler(object):
+
+    def __init__(self, handler, fetch=download, threads=8, connections=2, rate=1.0, burst=1, retries=3, backoff=1.0, frontier=None, attempts=3, report=10):
+        """ A multi-threaded crawler that calls handler(url, html, kind) for each downloaded page.
+            The handler can return a list of (url, kind)-tuples to crawl next.
+            Handlers are called one at a time, so they can safely append to the same corpus.
+            - fetch      : a function that returns the HTML source for a URL,
+            - threads    : the number of downloads in parallel,
+            - connections: the maximum number of parallel downloads per host,
+            - rate       : the average number of requests per second per host,
+            - retries    : the number of times a failed download is retried,
+            - backoff    : the delay in seconds before the first retry (doubles for each retry),
+            - frontier   : the path of the log file for resuming a crawl,
+            - attempts   : the number of crawls in which a failed URL is tried again,
+            - report     : the number of seconds between progress reports (None = no reports).
+        """
+        self.handler = handler
+        self.fetch = fetch
+        self.threads = threads
+        self.connections = connections
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.report = report
+        self.frontier = Frontier(frontier, attempts)
+        self.pages = 0
+        self.errors = 0
+        self.active = 0
+        self._hosts = {}
+        self._lock = Lock()
+        self._handler = Lock()
+
+    def push(self, url, kind=None):
+        """ Queues the given URL (with an optional kind, e.g., "listing" or "reviews").
+        """
+        return self.frontier.push(url, kind)
+
+    def _host(self, url):
+        # Returns the (Semaphore, TokenBucket) for the host of the given URL.
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (Semaphore(self.connections), TokenBucket(self.rate, self.burst))
+            return self._hosts[host]
+
+    def _download(self, url):
+        connections, bucket = self._host(url)
+        for i in range(self.retries + 1):
+            with connections:
+                bucket.wait()
+                try:
+                    return self.fetch(url)
+                except Exception, e:
+                    if i == self.retries:
+                        raise
+            sleep(self.backoff * 2 ** i * (0.5 + random())) # Jitter, so retries don't come in waves.
+
+    def _work(self):
+        while True:
+            url, kind = self.frontier.queue.get()
+            with self._lock:
+                self.active += 1
+            try:
+                html = self._download(url)
+                with self._handler:
+                    for url2, kind2 in self.handler(url, html, kind) or []:
+                        self.push(url2, kind2)
+                with self._lock:
+                    self.pages += 1
+                self.frontier.done(url)
+            except Exception, e:
+                with self._lock:
+                    self.errors += 1
+                sys.stderr.write("%s: %s\n" % (url, e))
+                self.frontier.done(url, failed=True)
+            with self._lock:
+                self.active -= 1
+
+    def _report(self, t):
+        while True:
+            sleep(self.report)
+            print "%s pages (%.2f pages/sec), %s errors, %s queued, %s active" % (
+                self.pages, self.pages / (time() - t), self.errors, len(self.frontier), self.active)
+
+    def run(self):
+        """ Crawls until there are no more URLs in the queue.
+        """
+        t = time()
+        for i in range(self.threads):
+            w = Thread(target=self._work)
+            w.daemon = True
+            w.start()
+        if self.report:
+            w = Thread(target=self._report, args=(t,))
+            w.daemon = True
+            w.start()
+        # Queue.join() blocks signals (e.g., Ctrl-C) in Python 2, so we poll instead.
+        q = self.frontier.queue
+        while q.unfinished_tasks:
+            sleep(0.1)
+        if self.report:
+            print "%s pages in %.1fs, %s errors" % (self.pages, time() - t, self.errors)
@@ -0,0 +1,62 @@
+from pattern.vector import Document
+from pattern.metrics import test as evaluate
+
+from multiprocessing import Pool, cpu_count
+from random import Random
+
+# PARALLEL CROSS-VALIDATION
+# =========================
+# SVM.test(data, folds=10) trains and tests 10 classifiers, one after another, on one core.
+# Each fold also converts the same reviews to vectors again.
+
+# The test() function below converts each review to a Document (= a vector) once,
+# and then runs the folds in a pool of processes, one per core.
+# The documents are stored in a global variable before the pool is created.
+# On Linux and Mac OS X, each process is a fork of this one,
+# so it can read the documents without receiving (pickling) a copy.
+# Each process only receives the number of the fold it has to test.
+
+# The documents must be the same as those the classifier makes itself.
+# For a list of words (or a string), Classifier.train() and classify() in Pattern
+# make a Document(words, filter=None, stopwords=True): every word is kept.
+# By default, a Document leaves out stopwords and words with other characters than letters or digits
+# (e.g., "aigre-doux"), which would give other scores than SVM.test() (see bench-crossval.py).
+
+# The documents shared with the worker processes.
+_documents = []
+_Classifier = None
+_kwargs = {}
+
+def partition(n, k=10):
+    """ Returns a list of k (i, j)-tuples that divide the range 0-n in k equal parts.
+    """
+    return [(n * i / k, n * (i + 1) / k) for i in range(k)]
+
+def _test(fold):
+    # Trains a classifier on all documents except those in the given (i, j)-fold,
+    # and returns its (accuracy, precision, recall, F1-score) on the documents in the fold.
+    i, j = fold
+    classifier = _Classifier(**_kwargs)
+    for document in _documents[:i] + _documents[j:]:
+        classifier.train(document)
+    return evaluate(lambda document: classifier.classify(document), [(d, d.type) for d in _documents[i:j]])
+
+def test(Classifier, documents=[], folds=10, processes=None, seed=None, **kwargs):
+    """ Returns an (accuracy, precision, recall, F1-score)-tuple for the given classifier class,
+        averaged over K-fold cross-validation (K = folds), like Classifier.test().
+        The documents are Document objects or (words, type)-tuples.
+        The folds are tested in parallel, by default using all cores.
+        With a seed, the documents are always shuffled in the same order.
+    """
+    global _documents, _Classifier, _kwargs
+    _documents = [d if isinstance(d, Document) else Document(d[0], type=d[1], filter=None, stopwords=True) for d in documents]
+    Random(seed).shuffle(_documents) # Avoid a list sorted by type (because we take successive folds).
+    _Classifier = Classifier
+    _kwargs = kwargs
+    pool = Pool(processes or cpu_count())
+    try:
+        m = pool.map(_test, partition(len(_documents), folds))
+    finally:
+        pool.close()
+        pool.join()
+    return tuple(sum(v) / float(folds) for v in zip(*m))
@@ -0,0 +1,201 @@
+from numpy import array, int64, uint64, uint32
+from numpy.random import RandomState
+from zlib import crc32
+from time import time
+
+import os
+import sys
+
+from tokenizer import words
+
+# NEAR-DUPLICATE REVIEWS
+# ======================
+# Amazon shows the same reviews for each edition of a book (paperback, pocket, e-book, ...),
+# so books-fr.csv has the same review several times, sometimes with a small difference.
+# Duplicates count double when we train a classifier,
+# and when one copy ends up in the training data and another in the test data,
+# the test is too easy (see 4-svm.py).
+
+# Comparing each review to every other review takes n x n steps: impossible for millions of reviews.
+# Instead, we use MinHash and locality-sensitive hashing (LSH):
+# 1) Each review is a set of "shingles": each 3 successive words ("un tres bon", "tres bon livre", ...).
+#    The similarity of two reviews is the Jaccard index of their shingles (shared / all).
+# 2) The signature of a review is the smallest hash of its shingles, for 128 different hash functions.
+#    The chance that two reviews have the same smallest hash is their Jaccard index,
+#    so the % of equal values in two signatures estimates the similarity.
+# 3) The signature is cut into 16 bands of 8 values. Reviews that have an identical band are candidates.
+#    Similar reviews are very likely to share a band, different reviews very unlikely,
+#    so we only look up 16 keys in a dictionary for each review, instead of comparing it to all others.
+#    The candidates are then compared by their signatures.
+# A review is a duplicate if it is at least 80% similar (threshold) to a review we have seen before.
+# The time is linear in the number of reviews.
+# The memory is a signature (512 bytes) + 16 keys for each review that is not a duplicate.
+
+P = (1 << 31) - 1 # A prime number larger than the hash values.
+
+def shingles(s, k=3):
+    """ Returns an array of hash values for each k successive words in the given string.
+        A string with less than k words is a single shingle.
+    """
+    w = words(s)
+    if not w:
+        return array([], dtype=uint64)
+    # Each word is hashed once (in C), and the hash of k words is computed from the hashes of the words.
+    h = array(map(crc32, u" ".join(w).encode("utf-8").split(" ")), dtype=int64).astype(uint64) & 0x7fffffff
+    n = max(1, len(h) - k + 1)
+    x = h[:n]
+    for i in range(1, min(k, len(h))):
+        x = (x * 1000003 + h[i:n+i]) % P
+    return x
+
+def _random64(r, n):
+    # Returns an array of n random 64-bit integers (from two 31-bit halves).
+    return (r.randint(0, P, n).astype(uint64) << uint64(33)) ^ (r.randint(0, P, n).astype(uint64) << uint64(2))
+
+class Dedup(object):
+
+    def __init__(self, threshold=0.8, permutations=128, bands=16, k=3, seed=0):
+        """ Finds near-duplicate strings: strings with at least the given similarity
+            (Jaccard index of their k-word shingles) to a string that was added before.
+        """
+        r = RandomState(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.k = k
+        self.n = 0          # Number of strings added.
+        self.duplicates = 0 # Number of duplicates found.
+        self.clusters = {}  # id => number of duplicates of the string with the given id.
+        # Each hash function is (a * x + b) >> 32 (multiply-shift), with random 64-bit a and b,
+        # where the multiplication overflows on purpose: numpy does it in C, without a slow modulo.
+        self._a = _random64(r, permutations) | uint64(1)
+        self._b = _random64(r, permutations)
+        self._signatures = {} # id => signature of each string that is not a duplicate.
+        self._buckets = [{} for i in range(bands)] # band key => [id, ...]
+
+    def signature(self, s):
+        """ Returns the MinHash signature of the given string (an array of integers), or None.
+        """
+        x = shingles(s, self.k)
+        if not len(x):
+            return None
+        return ((self._a[:,None] * x[None,:] + self._b[:,None]) >> uint64(32)).min(axis=1).astype(uint32)
+
+    def _keys(self, v):
+        r = len(v) / self.bands
+        return [v[i*r:(i+1)*r].tostring() for i in range(self.bands)]
+
+    def similar(self, s):
+        """ Returns the id of a string added before that is similar to the given string, or None.
+        """
+        return self._similar(self.signature(s))
+
+    def _similar(self, v):
+        if v is None:
+            return None
+        best = (0.0, None)
+        seen = set()
+        for bucket, key in zip(self._buckets, self._keys(v)):
+            for id in bucket.get(key, ()):
+                if id not in seen:
+                    seen.add(id)
+                    best = max(best, ((self._signatures[id] == v).mean(), -id))
+        if best[0] >= self.threshold:
+            return -best[1]
+
+    def add(self, s):
+        """ Adds the given string and returns None, or returns the id of the string it is a duplicate of.
+            The id of a string is the number of strings added before it (0, 1, 2, ...).
+        """
+        v = self.signature(s)
+        id = self._similar(v)
+        if id is not None:
+            self.duplicates += 1
+            self.clusters[id] = self.clusters.get(id, 0) + 1
+        elif v is not None:
+            self._signatures[self.n] = v
+            for bucket, key in zip(self._buckets, self._keys(v)):
+                bucket.setdefault(key, []).append(self.n)
+        self.n += 1
+        return id
+
+    def __repr__(self):
+        return "Dedup(strings=%s, duplicates=%s, clusters=%s)" % (self.n, self.duplicates, len(self.clusters))
+
+class Unique(object):
+
+    def __init__(self, writer, texts=[], column=0, dedup=None):
+        """ Wraps a CorpusWriter (see corpus.py), so that rows with a near-duplicate text are not appended.
+            The given texts (e.g., the rows already in the file) are added to the Dedup first.
+        """
+        self.writer = writer
+        self.column = column
+        self.dedup = dedup or Dedup()
+        self.skipped = 0
+        for s in texts:
+            self.dedup.add(s)
+
+    def append(self, row):
+        """ Appends the given row, unless its text is a near-duplicate. Returns True if appended.
+        """
+        if self.dedup.add(row[self.column]) is not None:
+            self.skipped += 1
+            return False
+        self.writer.append(row)
+        return True
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+# The same, as a batch pass over an existing .csv file:
+#
+#    python dedup.py books-fr.csv books-fr.dedup.csv
+#
+# This prints the number of duplicates and the largest clusters (the same review, n times),
+# and saves the rows that are not a duplicate.
+
+def run(input, output, column=0, **kwargs):
+    """ Saves the rows of the given .csv file without near-duplicates as a new .csv file,
+        and returns the Dedup.
+    """
+    from corpus import rows, CorpusWriter
+    if os.path.exists(output):
+        os.remove(output)
+    d = Dedup(**kwargs)
+    w = Unique(CorpusWriter(output), column=column, dedup=d)
+    t = time()
+    for row in rows(input):
+        w.append(row)
+    w.close()
+    t = time() - t
+    print "%s rows, %s near-duplicates in %s clusters, %s rows saved to %s" % (
+        d.n, d.duplicates, len(d.clusters), d.n - d.duplicates, output)
+    print "%.1fs (%.0f rows/sec)" % (t, d.n / (t or 1e-9))
+    print
+    # The largest clusters. The id of a row is its position in the file.
+    top = sorted(d.clusters.items(), key=lambda x: -x[1])[:10]
+    ids = set(id for id, n in top)
+    texts = {}
+    for i, row in enumerate(rows(input)):
+        if len(texts) == len(ids):
+            break
+        if i in ids:
+            texts[i] = row[column]
+    for id, n in top:
+        print "%sx %s" % (n + 1, texts[id][:80].replace("\n", " ").encode("utf-8"))
+    return d
+
+if __name__ == "__main__":
+    run(sys.argv[1], sys.argv[2])
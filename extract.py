@@ -0,0 +1,169 @@
+from HTMLParser import HTMLParser
+
+from pattern.web import plaintext
+
+# STREAMING HTML EXTRACTION
+# =========================
+# For each page, 2-amazon.py used to build a DOM (a tree of all the HTML elements in the page),
+# only to find a few links, star ratings and reviews in it.
+# Building the tree takes most of the time, and all of the page is in memory (several times).
+
+# The parsers below read the HTML from start to end, like a SAX parser:
+# the HTMLParser calls handle_starttag(), handle_data(), handle_endtag(), ... as it goes,
+# and we only keep track of the elements we are inside of (a stack of tag names),
+# and of what we are looking for.
+# The results are the same as with the DOM in 2-amazon.py:
+# - products(html) returns the book id in the first link of each element with class="prod",
+# - reviews(html) returns a (text, score)-tuple for each <div> in id="productReviews"
+#   that contains a class="swSprite" element with a title ("5.0 etoiles sur 5"),
+#   where the text is the text directly inside the <div> (not inside other elements).
+
+# Elements that have no end tag.
+VOID = set(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "wbr"))
+
+class Parser(HTMLParser):
+
+    def __init__(self):
+        """ An HTMLParser that keeps a stack of the open elements.
+            Subclasses implement start(tag, attributes), end(tag) and text(s).
+        """
+        HTMLParser.__init__(self)
+        self.stack = []
+
+    def handle_starttag(self, tag, attributes):
+        self.start(tag, dict(attributes))
+        if tag not in VOID:
+            self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        # Elements that are not closed (e.g., <p> without </p>) are closed by the end tag of their parent.
+        if tag in self.stack:
+            while self.stack:
+                self.end(self.stack[-1])
+                if self.stack.pop() == tag:
+                    break
+
+    def handle_data(self, s):
+        self.text(s)
+
+    def handle_entityref(self, name):
+        self.text("&%s;" % name) # Decoded by plaintext().
+
+    def handle_charref(self, name):
+        self.text("&#%s;" % name)
+
+    def handle_comment(self, s):
+        self.start("!--", {}) # A comment separates two pieces of text, like an element.
+
+    def start(self, tag, attributes):
+        pass
+
+    def end(self, tag):
+        pass
+
+    def text(self, s):
+        pass
+
+    def close(self):
+        HTMLParser.close(self)
+        while self.stack:
+            self.end(self.stack[-1])
+            self.stack.pop()
+
+def classes(attributes):
+    return (attributes.get("class") or "").split()
+
+class Products(Parser):
+
+    def __init__(self):
+        """ Collects the book id in the first link of each class="prod" element.
+        """
+        Parser.__init__(self)
+        self.products = []
+        self._open = [] # The class="prod" elements we are in that have no link yet.
+
+    def start(self, tag, attributes):
+        if "prod" in classes(attributes) and tag not in VOID:
+            self.products.append(None)
+            self._open.append((len(self.stack), len(self.products) - 1))
+        if tag == "a" and self._open:
+            href = attributes.get("href") or ""
+            if "/" in href:
+                # http://www.amazon.fr/dieux-voyagent-toujours-incognito/dp/2266219154/
+                for depth, i in self._open:
+                    self.products[i] = href.split("/")[-2]
+            self._open = []
+
+    def end(self, tag):
+        while self._open and self._open[-1][0] >= len(self.stack) - 1:
+            self._open.pop()
+
+def products(html):
+    """ Returns a list of book id's on the given overview page.
+    """
+    p = Products()
+    p.feed(html)
+    p.close()
+    return [id for id in p.products if id is not None]
+
+class Reviews(Parser):
+
+    def __init__(self, id="productReviews"):
+        """ Collects a (text, score)-tuple for each <div> with a star rating in the element with the given id.
+        """
+        Parser.__init__(self)
+        self.id = id
+        self.reviews = []
+        self._table = None # The depth of the element with the given id.
+        self._done = False
+        self._divs = []    # The <div>'s we are in: [depth, score, text, position].
+        self._n = 0
+
+    def start(self, tag, attributes):
+        if self._table is None:
+            if not self._done and attributes.get("id") == self.id and tag not in VOID:
+                self._table = len(self.stack)
+            return
+        if "swSprite" in classes(attributes):
+            # The star rating is <span class="swSprite s_star_5_0 " title="5.0 etoiles sur 5">.
+            # Only the first one in each <div> counts.
+            for div in self._divs:
+                if div[1] is None:
+                    try:
+                        div[1] = float(attributes["title"].split(" ")[0])
+                    except Exception, e:
+                        div[1] = False
+        # The text directly inside a <div> is a list of pieces, separated by elements (None).
+        if self._divs and self._divs[-1][0] == len(self.stack) - 1:
+            self._divs[-1][2].append(None)
+        if tag == "div":
+            self._divs.append([len(self.stack), None, [], self._n])
+            self._n += 1
+
+    def end(self, tag):
+        if self._table is None:
+            return
+        depth = len(self.stack) - 1
+        if self._divs and self._divs[-1][0] == depth:
+            depth, score, text, i = self._divs.pop()
+            text = " ".join(s for s in "".join(s or "\0" for s in text).split("\0") if s)
+            text = plaintext(text.strip()) # Remove HTML entities, tags, etc.
+            if isinstance(score, float) and text:
+                self.reviews.append((i, text, score))
+        elif self._divs and self._divs[-1][0] == depth - 1:
+            self._divs[-1][2].append(None)
+        if depth == self._table:
+            self._table = None
+            self._done = True
+
+    def text(self, s):
+        if self._divs and self._divs[-1][0] == len(self.stack) - 1:
+            self._divs[-1][2].append(s)
+
+def reviews(html):
+    """ Returns a list of (text, score)-tuples on the given review page.
+    """
+    p = Reviews()
+    p.feed(html)
+    p.close()
+    return [(text, score) for i, text, score in sorted(p.reviews)]
@@ -0,0 +1,234 @@
+from threading import local, Lock
+from functools import wraps
+from math import log, floor
+from time import time
+
+import os
+import sys
+import json
+import atexit
+import pstats
+import cProfile
+
+# INSTRUMENTATION
+# ===============
+# When a script is slow, where does the time go?
+# Reading .csv files, splitting words, looking up words, training the SVM, saving files, ...?
+# The scripts only print their results.
+
+# This module has named stages (timers), counters and histograms.
+# The scripts wrap each step in a stage, and count things as they go:
+#
+#    with stage("train"):
+#        ...
+#    count("rows read")
+#    count("lexicon hits", n)
+#
+# A stage inside another stage is reported as "outer/inner".
+# Each stage also keeps a histogram of its duration, so a stage that runs once per review
+# (e.g., a download) shows the median and 99th percentile, not just the total.
+
+# By default, all of this is switched off, and costs next to nothing:
+# stage() returns a context manager that does nothing, and count() returns right away.
+# Functions decorated with @timed are not even wrapped.
+# Run a script with INSTRUMENT=1 to switch it on:
+#
+#    INSTRUMENT=1 python 4-svm.py
+#
+# At the end, a report with the time per stage and the counters is printed (to stderr),
+# and saved as instrument.json.
+# With INSTRUMENT=profile, the stages also run under cProfile,
+# and the profile of the stage that took the most time is printed and saved as instrument.prof
+# (python -m pstats instrument.prof). Profiling makes the code a lot slower.
+
+MODE = os.environ.get("INSTRUMENT", "").lower()
+ENABLED = MODE not in ("", "0", "off")
+PROFILE = MODE == "profile"
+
+REPORT = "instrument.json"
+PROFILE_PATH = "instrument.prof"
+
+class Histogram(object):
+
+    def __init__(self, resolution=4):
+        """ A histogram of positive values (e.g., seconds),
+            in buckets that are 2^(1/resolution) wider than the previous one.
+        """
+        self.resolution = resolution
+        self.buckets = {}
+        self.n = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, v):
+        i = int(floor(log(max(v, 1e-9), 2) * self.resolution))
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.n += 1
+        self.sum += v
+        self.min = min(self.min, v)
+        self.max = max(self.max, v)
+
+    def percentile(self, p):
+        """ Returns the (approximate) value below which p (0.0-1.0) of the values are.
+        """
+        n = 0
+        for i in sorted(self.buckets):
+            n += self.buckets[i]
+            if n >= p * self.n:
+                return min(2 ** ((i + 1.0) / self.resolution), self.max)
+        return self.max
+
+    def json(self):
+        return {
+               "n": self.n,
+            "mean": self.sum / (self.n or 1),
+             "min": self.n and self.min or 0.0,
+             "p50": self.percentile(0.50),
+             "p99": self.percentile(0.99),
+             "max": self.max
+        }
+
+_start = time()
+_lock = Lock()
+_local = local()     # The active stages in this thread.
+_stages = {}         # "outer/inner" => [calls, seconds, Histogram, pstats.Stats]
+_counters = {}       # name => int
+_histograms = {}     # name => Histogram
+
+class _Stage(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(self.name)
+        self.path = "/".join(stack)
+        self.profile = None
+        if PROFILE and not _local.__dict__.get("profiling"):
+            # cProfile can only profile one thing at a time, so only the outermost stage is profiled.
+            _local.profiling = True
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.t = time()
+        return self
+
+    def __exit__(self, *args):
+        t = time() - self.t
+        if self.profile:
+            self.profile.disable()
+            _local.profiling = False
+        _local.stack.pop()
+        with _lock:
+            if self.path not in _stages:
+                _stages[self.path] = [0, 0.0, Histogram(), None]
+            s = _stages[self.path]
+            s[0] += 1
+            s[1] += t
+            s[2].add(t)
+            if self.profile and s[3] is None:
+                s[3] = pstats.Stats(self.profile)
+            elif self.profile:
+                s[3].add(self.profile)
+
+class _Nothing(object):
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        pass
+
+_NOTHING = _Nothing()
+
+def stage(name):
+    """ Returns a context manager that times the code in the with-block as the given stage.
+    """
+    if not ENABLED:
+        return _NOTHING
+    return _Stage(name)
+
+def timed(name):
+    """ Returns a decorator that times each call to the function as the given stage.
+    """
+    def decorator(f):
+        if not ENABLED:
+            return f
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    """ Adds n to the given counter.
+    """
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+def observe(name, v):
+    """ Adds the given value (e.g., a latency in seconds, or a number of words) to the given histogram.
+        The values are reported as they are, so put the unit in the name.
+    """
+    if ENABLED:
+        with _lock:
+            if name not in _histograms:
+                _histograms[name] = Histogram()
+            _histograms[name].add(v)
+
+def report():
+    """ Returns a dict with the stages, counters and histograms so far.
+    """
+    with _lock:
+        stages = {}
+        for k, (n, t, h, p) in _stages.items():
+            stages[k] = h.json()
+            stages[k]["seconds"] = t
+        return {
+                "seconds": time() - _start,
+                 "stages": stages,
+               "counters": dict(_counters),
+             "histograms": dict((k, h.json()) for k, h in _histograms.items())
+        }
+
+def text(r=None):
+    """ Returns the given report as a string with a table of stages and a list of counters.
+    """
+    r = r or report()
+    s = ["%-30s %8s %10s %7s %10s %10s" % ("stage", "calls", "seconds", "%", "p50 (ms)", "p99 (ms)")]
+    for k, v in sorted(r["stages"].items()):
+        s.append("%-30s %8s %10.3f %6.1f%% %10.3f %10.3f" % (
+            k, v["n"], v["seconds"], v["seconds"] / (r["seconds"] or 1) * 100, v["p50"] * 1000, v["p99"] * 1000))
+    s.append("%-30s %8s %10.3f" % ("total", "", r["seconds"]))
+    for k, v in sorted(r["histograms"].items()):
+        s.append("%s: n=%s p50=%.3f p99=%.3f max=%.3f" % (k, v["n"], v["p50"], v["p99"], v["max"]))
+    for k, v in sorted(r["counters"].items()):
+        s.append("%s: %s" % (k, v))
+    return "\n".join(s)
+
+def hottest():
+    """ Returns the (stage, pstats.Stats) of the profiled stage that took the most time, or None.
+    """
+    with _lock:
+        a = [(s[1], k, s[3]) for k, s in _stages.items() if s[3] is not None]
+    return a and max(a)[1:] or None
+
+def dump(path=REPORT):
+    """ Prints the report to stderr and saves it as a .json file.
+        With INSTRUMENT=profile, also prints and saves the profile of the hottest stage.
+    """
+    r = report()
+    sys.stderr.write("\n" + text(r) + "\n")
+    f = open(path, "w")
+    json.dump(r, f, indent=1, sort_keys=True)
+    f.close()
+    p = hottest()
+    if p:
+        sys.stderr.write("\nprofile of %s:\n" % p[0])
+        p[1].stream = sys.stderr
+        p[1].sort_stats("cumulative").print_stats(20)
+        p[1].dump_stats(PROFILE_PATH)
+
+if ENABLED:
+    atexit.register(dump)
@@ -0,0 +1,361 @@
+from pattern.db import Datasheet
+from pattern.metrics import avg
+
+from bisect import bisect_left
+from threading import Thread, Event, Lock
+from time import time
+
+import os
+import sys
+import mmap
+import struct
+
+from tokenizer import folded
+
+# COMPILED LEXICON
+# ================
+# Each time 7-sentiment.py starts, it parses "sentiment.csv - Sheet 1.csv",
+# averages the annotator scores, and then parses all of adj-fr.csv
+# to copy the score of each lemma to its inflected forms.
+# For a script that scores a single text, that is most of the work.
+
+# We can do this once and save the result in a compact binary file:
+# - a header: "LEX1" + the number of words n,
+# - n+1 offsets (uint32) into a string table,
+# - the string table: all words as UTF-8, sorted, one after another,
+# - n scores (float64), in the same order.
+# The file is memory-mapped, so loading it reads nothing until we look up a word.
+# A lookup is a binary search on the sorted words, no Python dict is built.
+# A binary search in Python is slow compared to a dict lookup, and a review has the same words over and over,
+# so the result of each lookup (score, or not in the lexicon) is kept in a small dict,
+# which is cleared when it has more than 100,000 words (so memory stays constant).
+# The scores are stored as float64 (not float32), so they are exactly the averages
+# computed from the .csv files, and positive() returns the same results.
+# By default, each form is also stored without accents (see tokenizer.folded()),
+# with "LEXF" instead of "LEX1" in the header,
+# so that 7-sentiment.py doesn't have to copy the whole table into a dict to add them.
+
+SHEET = "sentiment.csv - Sheet 1.csv"
+ADJECTIVES = "adj-fr.csv"
+COMPILED = "sentiment.bin"
+
+MAGIC = "LEX1"
+FOLDED = "LEXF" # The same, with the keys without accents.
+
+def load_csv(sheet=SHEET, adjectives=ADJECTIVES):
+    """ Returns a dictionary of form => score, from the annotation sheet
+        and the lexicon of adjectives (see 5-annotation.py).
+    """
+    sentiment = {}
+    for row in Datasheet.load(sheet, headers=True):
+        scores = [float(x) for x in row[3:] if x != ""]
+        if scores:
+            sentiment[row[0]] = avg(scores)
+    for lemma, forms in Datasheet.load(adjectives):
+        for form in forms.split(","):
+            if lemma in sentiment:
+                sentiment[form] = sentiment[lemma]
+    return sentiment
+
+def compile(path=COMPILED, sentiment=None, fold=True):
+    """ Writes the given dictionary of form => score to a binary file.
+        By default, the dictionary is loaded from the .csv files.
+        With fold=True, each form is also a key without accents.
+    """
+    if sentiment is None:
+        sentiment = load_csv()
+    if fold:
+        sentiment = folded(sentiment)
+    words = sorted((w.encode("utf-8"), v) for w, v in sentiment.items())
+    offsets = [0]
+    for w, v in words:
+        offsets.append(offsets[-1] + len(w))
+    n = len(words)
+    f = open(path + ".tmp", "wb")
+    f.write(struct.pack("<4sI", fold and FOLDED or MAGIC, n))
+    f.write(struct.pack("<%sI" % (n + 1), *offsets))
+    f.write("".join(w for w, v in words))
+    f.write("\0" * (-f.tell() % 8)) # Align the scores to 8 bytes.
+    f.write(struct.pack("<%sd" % n, *[v for w, v in words]))
+    f.close()
+    os.rename(path + ".tmp", path) # Readers never see a half-written file.
+
+class Lexicon(object):
+
+    def __init__(self, path=COMPILED):
+        """ A read-only dictionary of word => score, memory-mapped from a compiled file.
+        """
+        f = open(path, "rb")
+        self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        magic, n = struct.unpack_from("<4sI", self._buffer, 0)
+        if magic not in (MAGIC, FOLDED):
+            raise ValueError("%s is not a compiled lexicon" % path)
+        self.folded = magic == FOLDED
+        self._n = n
+        self._offsets = 8
+        self._strings = 8 + 4 * (n + 1)
+        self._scores = self._strings + self._offset(n)
+        self._scores += -self._scores % 8
+        self._cache = _Cache(self)
+        self.lookup = self._cache.__getitem__
+
+    def _offset(self, i):
+        return struct.unpack_from("<I", self._buffer, self._offsets + 4 * i)[0]
+
+    def _word(self, i):
+        i, j = struct.unpack_from("<II", self._buffer, self._offsets + 4 * i)
+        return self._buffer[self._strings + i : self._strings + j]
+
+    def index(self, w):
+        """ Returns the position of the given word in the lexicon, or -1.
+        """
+        if isinstance(w, unicode):
+            w = w.encode("utf-8")
+        i = bisect_left(_Words(self), w)
+        if i < self._n and self._word(i) == w:
+            return i
+        return -1
+
+    def score(self, i):
+        """ Returns the score of the word at the given position.
+        """
+        return struct.unpack_from("<d", self._buffer, self._scores + 8 * i)[0]
+
+    def keys(self):
+        return [self._word(i).decode("utf-8") for i in xrange(self._n)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self._n
+
+    # Lexicon.lookup(w) returns the score of the given word, or None.
+    # It is the [] of the cache (see _Cache), so a word that was looked up before is found in C.
+
+    def __contains__(self, w):
+        return self.lookup(w) is not None
+
+    def __getitem__(self, w):
+        v = self.lookup(w)
+        if v is None:
+            raise KeyError(w)
+        return v
+
+    def get(self, w, default=None):
+        v = self.lookup(w)
+        if v is None:
+            return default
+        return v
+
+class _Cache(dict):
+    # A dict of word => score (or None) with the words that were looked up,
+    # which does the binary search for words it doesn't have yet.
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+    def __missing__(self, w):
+        i = self.lexicon.index(w)
+        v = self.lexicon.score(i) if i >= 0 else None
+        if len(self) > 100000:
+            self.clear()
+        self[w] = v
+        return v
+
+class _Words(object):
+    # bisect_left() only needs len() and [], so we can search the string table in-place.
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+    def __len__(self):
+        return self.lexicon._n
+    def __getitem__(self, i):
+        return self.lexicon._word(i)
+
+def fresh(path=COMPILED, sources=(SHEET, ADJECTIVES)):
+    """ Returns True if the compiled file exists and is newer than the .csv files.
+    """
+    return os.path.exists(path) and all(os.path.getmtime(path) >= os.path.getmtime(f) for f in sources)
+
+def load(path=COMPILED, fold=None):
+    """ Returns the compiled lexicon if it is up-to-date, otherwise a dict loaded from the .csv files.
+        With fold=True or False, the compiled lexicon is only used
+        if it was compiled with (or without) the keys without accents.
+    """
+    if fresh(path):
+        table = Lexicon(path)
+        if fold is None or table.folded == fold:
+            return table
+    return load_csv()
+
+# HOT RELOAD
+# ==========
+# A program that keeps running (e.g., service.py) loads the lexicon once.
+# When the annotators add scores to the sheet, it has to be restarted to use them.
+
+# A Manager keeps its lexicon (Manager.table) up-to-date while it is being used.
+# A background thread checks the .csv files every few seconds.
+# If a file changed, it is parsed again and compared to the previous version,
+# to find the lemmas with a new score (the sheet) or new inflected forms (adj-fr.csv).
+# Only those lemmas and their forms are updated, in a copy of the table.
+# When the copy is ready, it replaces the table in a single assignment.
+# Code that reads Manager.table once and then uses that dict
+# never sees a half-updated table, and never has to wait for a reload.
+
+# Some forms belong to more than one lemma (e.g., jolie is a lemma and a form of joli).
+# In load_csv(), the last row in adj-fr.csv wins, and the Manager gives the same result.
+
+class Manager(object):
+
+    def __init__(self, sheet=SHEET, adjectives=ADJECTIVES, interval=1.0, callback=None):
+        """ A dictionary of form => score (Manager.table), reloaded in the background
+            when the given .csv files change, checking every interval seconds.
+            The optional callback(table) is called each time a new table is swapped in.
+        """
+        self.sheet = sheet
+        self.adjectives = adjectives
+        self.interval = interval
+        self.callback = callback
+        self.table = {}
+        self.reloads = 0
+        self.latency = 0.0 # Duration of the last reload, in seconds.
+        self._stat = {}    # path => (modification time, size)
+        self._scores = {}  # lemma => score, from the sheet.
+        self._a = _Adjectives()
+        self._lock = Lock()
+        self._stop = Event()
+        self.reload()
+        t = Thread(target=self._run)
+        t.daemon = True
+        t.start()
+
+    def _changed(self, path):
+        # Returns the (modification time, size) of the given file if it changed since the last reload.
+        s = os.stat(path)
+        s = (s.st_mtime, s.st_size)
+        return s != self._stat.get(path) and s
+
+    def _load_sheet(self):
+        # Returns a dict of lemma => score, and the set of lemmas with a different score.
+        scores = {}
+        for row in Datasheet.load(self.sheet, headers=True):
+            v = [float(x) for x in row[3:] if x != ""]
+            if v:
+                scores[row[0]] = avg(v)
+        changed = set(w for w in set(scores) | set(self._scores) if scores.get(w) != self._scores.get(w))
+        return scores, changed
+
+    def _load_adjectives(self):
+        # Returns the lemmas and forms in adj-fr.csv, indexed,
+        # and the set of lemmas and forms that need a new score.
+        a = _Adjectives(self.adjectives)
+        changed = set()
+        old = dict(zip(self._a.lemmas, self._a.forms))
+        new = dict(zip(a.lemmas, a.forms))
+        for w in set(old) | set(new):
+            if old.get(w) != new.get(w):
+                changed.add(w)
+                changed.update(old.get(w, ()))
+                changed.update(new.get(w, ()))
+        # If rows that share a form were moved, a different row may be the last one.
+        old = self._a.shared
+        new = a.shared
+        changed.update(w for w in set(old) | set(new) if old.get(w) != new.get(w))
+        return a, changed
+
+    def _affected(self, changed):
+        # Returns the given words + the forms that inherit their score, recursively.
+        affected = set()
+        todo = list(changed)
+        while todo:
+            w = todo.pop()
+            if w not in affected:
+                affected.add(w)
+                if w in self._a.row:
+                    todo.extend(self._a.forms[self._a.row[w]])
+        return affected
+
+    def _resolve(self, w, n):
+        # Returns the score of the given word after the first n rows in adj-fr.csv, like load_csv(),
+        # i.e., the score of the lemma in the last row that has this form and a lemma with a score.
+        for i in reversed(self._a.rows.get(w, ())):
+            if i < n:
+                v = self._resolve(self._a.lemmas[i], i)
+                if v is not None:
+                    return v
+        return self._scores.get(w)
+
+    def reload(self):
+        """ Updates the table if the .csv files changed since the last reload.
+            Returns the number of forms that were updated.
+        """
+        with self._lock:
+            t = time()
+            s1 = self._changed(self.sheet)
+            s2 = self._changed(self.adjectives)
+            changed = set()
+            # Parse the files before changing anything,
+            # so that a file that is still being written leaves the table as it was.
+            if s2:
+                a, c = self._load_adjectives()
+                changed.update(c)
+            if s1:
+                scores, c = self._load_sheet()
+                changed.update(c)
+            if s2:
+                self._a = a
+                self._stat[self.adjectives] = s2
+            if s1:
+                self._scores = scores
+                self._stat[self.sheet] = s1
+            if not changed:
+                return 0
+            table = dict(self.table)
+            affected = self._affected(changed)
+            for w in affected:
+                v = self._resolve(w, len(self._a.lemmas))
+                if v is None:
+                    table.pop(w, None)
+                else:
+                    table[w] = v
+            self.table = table # Swap.
+            self.reloads += 1
+            self.latency = time() - t
+        if self.callback:
+            self.callback(table)
+        return len(affected)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception, e:
+                sys.stderr.write("lexicon not reloaded: %s\n" % e) # Try again next time.
+
+    def stop(self):
+        """ Stops checking the .csv files.
+        """
+        self._stop.set()
+
+class _Adjectives(object):
+    # The rows in adj-fr.csv, indexed for Manager.
+    def __init__(self, path=None):
+        self.lemmas = [] # row => lemma
+        self.forms = []  # row => list of forms
+        self.row = {}    # lemma => row
+        self.rows = {}   # form => list of rows
+        self.shared = {} # word => lemmas of the rows that have it, for words in more than one row.
+        for i, (lemma, forms) in enumerate(Datasheet.load(path) if path else ()):
+            forms = forms.split(",")
+            self.lemmas.append(lemma)
+            self.forms.append(forms)
+            self.row[lemma] = i
+            for w in forms:
+                self.rows.setdefault(w, []).append(i)
+        for w, rows in self.rows.items():
+            if len(rows) > 1 or w in self.row and rows != [self.row[w]]:
+                rows = sorted(set(rows + [self.row[w]] if w in self.row else rows))
+                self.shared[w] = [self.lemmas[i] for i in rows]
+
+if __name__ == "__main__":
+    compile()
+    print "%s words compiled to %s" % (len(Lexicon()), COMPILED)
@@ -0,0 +1,50 @@
+from codecs import BOM_UTF8
+
+# STREAMING LEXIQUE
+# =================
+# Datasheet.load() reads the whole file and keeps every row in memory.
+# For Lexique380.txt (24MB) that is a lot of lists of Unicode strings,
+# just to keep the few thousand rows that are adjectives.
+# For larger lexical resources (several GB) it does not work at all.
+
+# Instead, we read the file one line at a time with a generator,
+# and only keep what we need: for each word class (ADJ, NOM, VER, ...),
+# a dictionary of lemma => forms + frequency.
+# Memory is bounded by the size of the vocabulary, not by the size of the file.
+
+# Lexique fields (0-based):
+ORTHO, LEMME, CGRAM, FREQLIVRES = 0, 2, 3, 9
+
+def rows(path, separator="\t", headers=True):
+    """ Yields each row in the given file as a list of Unicode fields,
+        reading one line at a time.
+        With headers=True, the first line is skipped.
+    """
+    f = open(path, "rb")
+    for i, line in enumerate(f):
+        if i == 0:
+            line = line.lstrip(BOM_UTF8)
+            if headers:
+                continue
+        line = line.rstrip("\r\n")
+        if line:
+            yield line.decode("utf-8").split(separator)
+    f.close()
+
+def lexicons(rows, tags=("ADJ",)):
+    """ Returns a dictionary of tag => list of (frequency, lemma, forms)-tuples,
+        sorted by frequency, highest-first, for the given word classes.
+        The frequency of a lemma is the sum of the frequency of its forms in books.
+    """
+    # For each tag, a dictionary of lemma => {form: frequency}.
+    # A form that occurs more than once (e.g., masculine + feminine row) is counted once.
+    f = dict((tag, {}) for tag in tags)
+    for row in rows:
+        tag = row[CGRAM]
+        if tag in f:
+            forms = f[tag].setdefault(row[LEMME], {})
+            forms[row[ORTHO]] = max(forms.get(row[ORTHO], 0.0), float(row[FREQLIVRES]))
+    for tag, lemmas in f.items():
+        f[tag] = [(sum(forms.values()), lemma, sorted(forms)) for lemma, forms in lemmas.items()]
+        f[tag] = sorted(f[tag], reverse=True) # Highest-first.
+    return f
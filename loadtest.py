@@ -0,0 +1,54 @@
+from threading import Thread
+from random import Random
+from time import time
+
+import sys
+import json
+import urllib2
+
+from corpus import rows
+
+# LOAD TEST
+# =========
+# Sends reviews from books-fr.csv to the sentiment service (see service.py),
+# from a number of concurrent clients, and reports the latency and throughput.
+# Start the service first: python service.py 8080
+# Usage: python loadtest.py [url] [clients] [requests per client] [texts per request]
+
+url = len(sys.argv) > 1 and sys.argv[1] or "http://localhost:8080/"
+clients = len(sys.argv) > 2 and int(sys.argv[2]) or 16
+requests = len(sys.argv) > 3 and int(sys.argv[3]) or 200
+texts = len(sys.argv) > 4 and int(sys.argv[4]) or 1
+
+reviews = [review for review, score in rows("books-fr.csv")]
+
+latency = []
+errors = []
+
+def client(seed):
+    r = Random(seed)
+    for i in range(requests):
+        data = [r.choice(reviews) for j in range(texts)]
+        data = json.dumps(texts == 1 and data[0] or data)
+        t = time()
+        try:
+            urllib2.urlopen(urllib2.Request(url, data, {"Content-Type": "application/json"})).read()
+            latency.append(time() - t)
+        except Exception, e:
+            errors.append(e)
+
+t = time()
+threads = [Thread(target=client, args=(i,)) for i in range(clients)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+t = time() - t
+
+latency.sort()
+n = len(latency)
+print "%s clients x %s requests x %s texts, %s errors" % (clients, requests, texts, len(errors))
+print "client p50: %.1fms" % (latency[n / 2] * 1000)
+print "client p99: %.1fms" % (latency[min(n - 1, n * 99 / 100)] * 1000)
+print "throughput: %.0f requests/sec, %.0f texts/sec" % (n / t, n * texts / t)
+print "server:", json.dumps(json.loads(urllib2.urlopen(url.rstrip("/") + "/metrics").read()), indent=4)
@@ -0,0 +1,181 @@
+from numpy import array, zeros
+from random import Random
+from zlib import crc32
+from math import sqrt, exp
+
+import cPickle
+
+from pattern.metrics import test as evaluate
+
+from tokenizer import words
+from crossval import partition
+
+# ONLINE LEARNING
+# ===============
+# The SVM in 4-svm.py is trained from scratch every time, on all the reviews.
+# A new review means training again on everything,
+# and the SVM keeps a dictionary with every word it has seen, which only grows.
+
+# The Online classifier below learns one review at a time,
+# so new reviews (e.g., from the crawler) can be added to a trained classifier,
+# and it can be saved and loaded to continue training later.
+# It uses two tricks:
+# 1) The hashing trick: each word is mapped to a column number between 0 and size,
+#    with a hash function (CRC32), instead of a dictionary of word => column number.
+#    Different words can get the same column, but with a large size that rarely matters.
+#    Half of the words count as -1 instead of +1 (another bit of the hash),
+#    so that words that end up in the same column tend to cancel each other out.
+#    The memory is a few vectors of size floats for each class, no matter how many words we see.
+# 2) The Passive-Aggressive algorithm (Crammer et al., 2006):
+#    if a review is classified correctly by a margin, nothing changes (passive);
+#    otherwise, the weights are changed just enough to classify it correctly (aggressive),
+#    but no more than C (with a smaller C, noisy reviews change the weights less).
+# Because each review changes the weights, the last reviews count more than the first.
+# We therefore classify with the average of the weights after each review ("averaged perceptron"),
+# which is a lot more accurate after a single pass over the data.
+# The average is kept up to date cheaply, with a second vector:
+# average = weights - total / (n + 1), where total adds (n + 1) * the change of each update.
+# With more than two classes, there is a weight vector for each class (one-vs-rest).
+
+# The features are the words in a review (see tokenizer.py), by default.
+# With ngrams=2, each pair of successive words is also a feature ("pas bon").
+# The classifier has the same train(), classify() and test() methods as the SVM,
+# and it can be used with crossval.test().
+
+class Online(object):
+
+    def __init__(self, size=2**18, ngrams=1, C=1.0):
+        """ A linear classifier that learns one document at a time (averaged Passive-Aggressive),
+            with the words (and n-grams) hashed to a fixed number of features.
+        """
+        self.size = size
+        self.ngrams = ngrams
+        self.C = C
+        self.classes = []
+        self.weights = [] # A weight vector for each class.
+        self.bias = []
+        self.n = 0 # Number of documents trained.
+        self._total = [] # For the average weights.
+        self._total_bias = []
+        self._hashes = {}
+
+    def _hash(self, w):
+        # Returns a (column, sign)-tuple for the given word.
+        h = crc32(isinstance(w, unicode) and w.encode("utf-8") or str(w)) & 0xffffffff
+        return h % self.size, h >> 31 and -1.0 or +1.0
+
+    def features(self, document):
+        """ Returns a (columns, values)-tuple of arrays for the given document,
+            which can be a string, a list of words, a dict of word => weight, or a Document.
+            The values are normalized (length 1.0).
+        """
+        if hasattr(document, "vector"):
+            document = document.vector
+        if isinstance(document, basestring):
+            document = words(document)
+        if isinstance(document, dict):
+            f = document
+        else:
+            f = {}
+            for n in range(1, self.ngrams + 1):
+                for i in range(len(document) - n + 1):
+                    w = n == 1 and document[i] or " ".join(document[i:i+n])
+                    f[w] = f.get(w, 0) + 1
+        # The column of each word is remembered (up to 100,000 words, so memory stays constant).
+        h = self._hashes
+        v = {}
+        for w, x in f.iteritems():
+            if w not in h:
+                if len(h) > 100000:
+                    h.clear()
+                h[w] = self._hash(w)
+            i, s = h[w]
+            v[i] = v.get(i, 0.0) + s * x
+        norm = sqrt(sum(x * x for x in v.itervalues())) or 1.0
+        return array(v.keys(), dtype=int), array(v.values(), dtype=float) / norm
+
+    def train(self, document, type=None):
+        """ Updates the classifier with the given document and type (label).
+            If the document is a Document, its type is used by default.
+        """
+        if type is None:
+            type = getattr(document, "type", None)
+        if type not in self.classes:
+            self.classes.append(type)
+            self.weights.append(zeros(self.size))
+            self.bias.append(0.0)
+            self._total.append(zeros(self.size))
+            self._total_bias.append(0.0)
+        i, x = self.features(document)
+        q = x.dot(x) + 1.0 # The bias is a feature that is always 1.0.
+        k = self.n + 1.0
+        for j, c in enumerate(self.classes):
+            w = self.weights[j]
+            y = c == type and +1.0 or -1.0
+            loss = 1.0 - y * (w[i].dot(x) + self.bias[j])
+            if loss > 0:
+                tau = min(self.C, loss / q)
+                w[i] += tau * y * x
+                self.bias[j] += tau * y
+                self._total[j][i] += k * tau * y * x
+                self._total_bias[j] += k * tau * y
+        self.n += 1
+
+    def update(self, documents):
+        """ Updates the classifier with the given list of (document, type)-tuples (or Documents),
+            for example a batch of new reviews.
+        """
+        for d in documents:
+            if isinstance(d, tuple):
+                self.train(*d)
+            else:
+                self.train(d)
+
+    def classify(self, document, discrete=True):
+        """ Returns the predicted type for the given document,
+            or a dict of type => probability if discrete=False.
+            The probabilities are the relative margins of each class (softmax),
+            not well calibrated, but higher = more certain (see roc.py).
+        """
+        if not self.classes:
+            return discrete and None or {}
+        i, x = self.features(document)
+        k = self.n + 1.0
+        m = [(w[i] - u[i] / k).dot(x) + b - ub / k
+            for w, b, u, ub in zip(self.weights, self.bias, self._total, self._total_bias)]
+        if discrete:
+            return self.classes[m.index(max(m))]
+        e = [exp(v - max(m)) for v in m]
+        return dict((c, v / sum(e)) for c, v in zip(self.classes, e))
+
+    @classmethod
+    def test(cls, documents=[], folds=10, seed=None, **kwargs):
+        """ Returns an (accuracy, precision, recall, F1-score)-tuple for the given documents,
+            averaged over K-fold cross-validation (K = folds), like SVM.test().
+            The documents are (document, type)-tuples or Documents.
+        """
+        documents = [isinstance(d, tuple) and d or (d, d.type) for d in documents]
+        Random(seed).shuffle(documents)
+        m = []
+        for i, j in partition(len(documents), folds):
+            classifier = cls(**kwargs)
+            classifier.update(documents[:i] + documents[j:])
+            m.append(evaluate(lambda document: classifier.classify(document), documents[i:j]))
+        return tuple(sum(v) / float(folds) for v in zip(*m))
+
+    def __getstate__(self):
+        d = dict(self.__dict__)
+        d["_hashes"] = {}
+        return d
+
+    def save(self, path):
+        f = open(path, "wb")
+        cPickle.dump(self, f, cPickle.HIGHEST_PROTOCOL)
+        f.close()
+
+    @classmethod
+    def load(cls, path):
+        return cPickle.load(open(path, "rb"))
+
+    def __repr__(self):
+        return "Online(classes=%s, trained=%s, size=%s)" % (self.classes, self.n, self.size)
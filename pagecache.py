@@ -0,0 +1,109 @@
+from hashlib import sha1
+from threading import Lock
+
+import zlib
+import sqlite3
+
+# PAGE CACHE
+# ==========
+# URL.download(cached=True) saves each downloaded page as a file, as it is, and never removes it.
+# A crawl of a few thousand pages takes hundreds of MB, and it only grows.
+
+# The PageCache class stores pages in a small database on disk:
+# - each page is compressed with zlib (HTML compresses well),
+# - each page is stored under the hash of its content ("content-addressed"),
+#   and each URL points to a hash, so identical pages at different URLs are stored once,
+# - the cache has a maximum size. When it is full, the least recently used URLs are removed,
+#   together with the pages that no URL points to anymore.
+# The crawler downloads pages in several threads, so the database is shared with a lock.
+
+class PageCache(object):
+
+    def __init__(self, path="pages.db", size=100*1024*1024):
+        """ A cache of downloaded pages (url => HTML), with a maximum size in bytes (compressed).
+        """
+        self.path = path
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("create table if not exists pages (hash blob primary key, value blob, size integer, unicode integer)")
+        if "unicode" not in [c[1] for c in self._db.execute("pragma table_info(pages)")]:
+            # A cache from before pages could be stored as bytes: all pages were Unicode (UTF-8).
+            self._db.execute("alter table pages add column unicode integer default 1")
+        self._db.execute("create table if not exists urls (url text primary key, hash blob, used integer)")
+        self._db.execute("create index if not exists urls_used on urls (used)")
+        self._db.execute("create index if not exists urls_hash on urls (hash)")
+        self._bytes = self._db.execute("select sum(size) from pages").fetchone()[0] or 0
+        self._clock = self._db.execute("select max(used) from urls").fetchone()[0] or 0
+
+    def get(self, url):
+        """ Returns the HTML for the given URL, or None.
+            The HTML is a Unicode string or a byte string, like it was given to set().
+        """
+        with self._lock:
+            self._clock += 1
+            v = self._db.execute(
+                "select pages.value, pages.unicode from urls, pages where urls.url=? and pages.hash=urls.hash", (url,)).fetchone()
+            if v is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("update urls set used=? where url=?", (self._clock, url))
+            s = zlib.decompress(v[0])
+            return v[1] and s.decode("utf-8") or s
+
+    def set(self, url, html):
+        """ Stores the given HTML (a Unicode string or a byte string) for the given URL.
+        """
+        u = isinstance(html, unicode)
+        s = u and html.encode("utf-8") or html
+        # The same bytes as a Unicode string or as a byte string are stored as two pages.
+        k = sqlite3.Binary(sha1(s + (u and "u" or "b")).digest())
+        with self._lock:
+            self._clock += 1
+            if self._db.execute("select 1 from pages where hash=?", (k,)).fetchone() is None:
+                v = sqlite3.Binary(zlib.compress(s, 9))
+                self._db.execute("insert into pages values (?, ?, ?, ?)", (k, v, len(v), int(u)))
+                self._bytes += len(v)
+            old = self._db.execute("select hash from urls where url=?", (url,)).fetchone()
+            self._db.execute("insert or replace into urls values (?, ?, ?)", (url, k, self._clock))
+            if old is not None and str(old[0]) != str(k):
+                self._orphan(old[0]) # The page at this URL changed.
+            if self._bytes > self.size:
+                self._evict()
+            self._db.commit()
+
+    def _orphan(self, k):
+        # Removes the page with the given hash if no URL points to it.
+        if self._db.execute("select 1 from urls where hash=?", (k,)).fetchone() is None:
+            n = self._db.execute("select size from pages where hash=?", (k,)).fetchone()
+            self._db.execute("delete from pages where hash=?", (k,))
+            self._bytes -= n and n[0] or 0
+
+    def _evict(self):
+        # Removes the least recently used URLs (and their pages), until the cache is 90% full.
+        for url, k in self._db.execute("select url, hash from urls order by used").fetchall():
+            if self._bytes <= self.size * 0.9:
+                break
+            self._db.execute("delete from urls where url=?", (url,))
+            self._orphan(k)
+
+    def footprint(self):
+        """ Returns a (urls, pages, compressed bytes)-tuple.
+        """
+        with self._lock:
+            return (
+                self._db.execute("select count(*) from urls").fetchone()[0],
+                self._db.execute("select count(*) from pages").fetchone()[0],
+                self._bytes)
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def __repr__(self):
+        return "PageCache(hits=%s, misses=%s, size=%.1fMB)" % (
+            self.hits, self.misses, self._bytes / 1024.0 / 1024)
@@ -0,0 +1,345 @@
+from multiprocessing import cpu_count
+from datetime import datetime
+from hashlib import sha1
+from time import time
+
+import os
+import re
+import sys
+import json
+import subprocess
+
+# PIPELINE
+# ========
+# The workshop is a chain of scripts that pass on their results in files:
+# 1-lexique.py => adj-fr.csv, 2-amazon.py => books-fr.csv, 3-aligned.py => books-fr.test.csv, ...
+# After a change (e.g., in tokenizer.py, or a new books-fr.csv), which scripts do we need to run again?
+# Running all of them takes a while, and it is easy to forget one.
+
+# The pipeline below knows what each step (stage) reads and writes,
+# and only runs a stage if something it depends on has changed since the last run:
+# - the script, and the modules in this folder that it imports (e.g., tokenizer.py),
+# - the input files (e.g., books-fr.csv),
+# - the parameters (environment variables that change the results).
+# Files are compared by the hash of their content (SHA-1), not by their date,
+# so a stage that produces the same file as before doesn't make the next stages run again.
+# Stages that don't depend on each other (e.g., 4-svm.py and 6-frequency.py) run in parallel,
+# each in its own Python process, with the output of each stage saved in pipeline-logs/.
+# The time of each stage is added to pipeline-log.json, so you can see where the time goes,
+# and how much time was saved by the stages that were skipped.
+#
+#    python pipeline.py              # runs the stages that changed
+#    python pipeline.py 4-svm        # runs 4-svm.py (and the stages before it, if they changed)
+#    python pipeline.py --force      # runs all stages
+#    python pipeline.py --dry        # shows which stages would run, and why
+#
+# 2-amazon.py crawls Amazon for hours, so it is "manual": it only runs when you ask for it.
+# Lexique380.txt is not included (it is large), so 1-lexique.py only runs when you download it.
+# Until then, the stages use the adj-fr.csv and books-fr.csv that come with the workshop.
+
+# Files up to 1MB are hashed every time.
+# Larger files are only hashed again if their size or modification time changed,
+# so an edit that keeps the size, within the time resolution of the file system
+# (e.g., 2 seconds on FAT, 1 second on older ext3 and HFS+), is not noticed.
+# Run the stage with --force (or remove pipeline.json) if that happens.
+
+STATE = "pipeline.json"
+LOG = "pipeline-log.json"
+LOGS = "pipeline-logs"
+
+SMALL = 1024 * 1024
+
+class Stage(object):
+
+    def __init__(self, name, script, inputs=[], outputs=[], params={}, manual=False):
+        """ A step in the pipeline: a script that reads the given input files and writes the given output files.
+            The params are environment variables for the script.
+            A manual stage only runs if it is named on the command line.
+        """
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params)
+        self.manual = manual
+
+    def __repr__(self):
+        return "Stage(%s)" % repr(self.name)
+
+SHEET = "sentiment.csv - Sheet 1.csv"
+
+STAGES = [
+    Stage("1-lexique", "1-lexique.py",
+          inputs = ["Lexique380/Bases+Scripts/Lexique380.txt"],
+         outputs = ["adj-fr.csv", "nom-fr.csv", "ver-fr.csv"]),
+    Stage("2-amazon", "2-amazon.py",
+         outputs = ["books-fr.csv"], manual=True),
+    Stage("3-aligned", "3-aligned.py",
+          inputs = ["books-fr.csv"],
+         outputs = ["books-fr.test.csv"]),
+    Stage("4-svm", "4-svm.py",
+          inputs = ["books-fr.test.csv", "adj-fr.csv"]),
+    Stage("5-annotation", "5-annotation.py",
+          inputs = ["books-fr.test.csv", "adj-fr.csv", SHEET],
+         outputs = ["roc-lexicon.csv"]),
+    Stage("6-frequency", "6-frequency.py",
+          inputs = ["books-fr.csv", "adj-fr.csv"],
+         outputs = ["sentiment.csv"]),
+    Stage("lexicon", "lexicon.py",
+          inputs = [SHEET, "adj-fr.csv"],
+         outputs = ["sentiment.bin"]),
+    Stage("7-sentiment", "7-sentiment.py",
+          inputs = ["sentiment.bin", SHEET, "adj-fr.csv"])
+]
+
+#--- DEPENDENCIES ----------------------------------------------------------------------------------
+
+IMPORT = re.compile(r"^\s*(?:from\s+(\w+)\s+import|import\s+([\w, ]+))", re.M)
+SOURCE = re.compile(r"load_source\(.*?[\"']([\w\-]+\.py)[\"']")
+
+def modules(script, folder="."):
+    """ Returns the set of .py files in the given folder that the given script uses,
+        including the script itself and the modules they import in turn.
+    """
+    seen = set()
+    queue = [script]
+    while queue:
+        path = queue.pop()
+        if path in seen or not os.path.exists(os.path.join(folder, path)):
+            continue
+        seen.add(path)
+        s = open(os.path.join(folder, path)).read()
+        for m1, m2 in IMPORT.findall(s):
+            for m in (m1 or m2).split(","):
+                m = m.strip().split(" ")[0] + ".py"
+                if os.path.exists(os.path.join(folder, m)):
+                    queue.append(m)
+        queue.extend(SOURCE.findall(s))
+    return seen
+
+#--- PIPELINE --------------------------------------------------------------------------------------
+
+class Pipeline(object):
+
+    def __init__(self, stages=STAGES, folder=None, state=STATE, log=LOG, logs=LOGS):
+        """ Runs the given list of stages in the given folder, skipping the stages that have not changed.
+            The fingerprints of the last successful run of each stage are saved in the state file.
+        """
+        self.stages = stages
+        self.folder = folder or os.path.dirname(os.path.abspath(__file__))
+        self.state = os.path.join(self.folder, state)
+        self.log = os.path.join(self.folder, log)
+        self.logs = os.path.join(self.folder, logs)
+        self._state = os.path.exists(self.state) and json.load(open(self.state)) or {}
+        self._state.setdefault("stages", {})
+        self._state.setdefault("hashes", {})
+        # Output file => stage that writes it.
+        self._producers = dict((path, stage) for stage in stages for path in stage.outputs)
+
+    def upstream(self, stage):
+        """ Returns the list of stages that write the input files of the given stage.
+        """
+        return [self._producers[path] for path in stage.inputs if path in self._producers]
+
+    def _path(self, path):
+        return os.path.join(self.folder, path)
+
+    def hash(self, path):
+        """ Returns the SHA-1 hash of the content of the given file, or None if it doesn't exist.
+        """
+        p = self._path(path)
+        if not os.path.exists(p):
+            return None
+        # Large files (books-fr.csv) are only read again if their size or date changed.
+        # Small files (scripts, adj-fr.csv) are always read.
+        k = [os.path.getsize(p), os.path.getmtime(p)]
+        v = self._state["hashes"].get(path)
+        if v and v[:2] == k and k[0] > SMALL:
+            return v[2]
+        h = sha1()
+        f = open(p, "rb")
+        for chunk in iter(lambda: f.read(1024 * 1024), ""):
+            h.update(chunk)
+        f.close()
+        self._state["hashes"][path] = k + [h.hexdigest()]
+        return h.hexdigest()
+
+    def fingerprint(self, stage):
+        """ Returns a dict of everything the given stage depends on: file => hash, $param => value.
+        """
+        f = {}
+        for path in sorted(modules(stage.script, self.folder)) + stage.inputs:
+            f[path] = self.hash(path)
+        for k, v in stage.params.items():
+            f["$" + k] = str(v)
+        return f
+
+    def changed(self, stage):
+        """ Returns the reason why the given stage needs to run (e.g., "books-fr.csv changed"), or None.
+        """
+        s = self._state["stages"].get(stage.name)
+        if s is None:
+            return "never run"
+        f1 = s["fingerprint"]
+        f2 = self.fingerprint(stage)
+        for k in sorted(set(f1) | set(f2)):
+            if f1.get(k) != f2.get(k):
+                return "%s changed" % k
+        for path, h in s["outputs"].items():
+            if self.hash(path) != h:
+                return "%s changed" % path # Edited or removed by hand.
+
+    def _start(self, stage):
+        # Starts the script in a new Python process, with its output saved to pipeline-logs/<name>.log.
+        if not os.path.exists(self.logs):
+            os.makedirs(self.logs)
+        env = dict(os.environ)
+        # Python 2 prints Unicode as ASCII when the output is not a terminal (e.g., "Review: tres decevant").
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        env.update((k, str(v)) for k, v in stage.params.items())
+        f = open(os.path.join(self.logs, stage.name + ".log"), "w")
+        p = subprocess.Popen([sys.executable, stage.script], cwd=self.folder, env=env, stdout=f, stderr=f)
+        f.close()
+        return p
+
+    def run(self, names=[], force=False, dry=False, processes=None):
+        """ Runs the stages with the given names (by default, all stages that are not manual),
+            and the stages before them that changed, with at most the given number of processes.
+            With force=True, the given stages (or all of them) run even if nothing changed.
+            With dry=True, nothing runs, but the stages that would run are reported.
+            Returns a list of results (dicts), one for each stage.
+        """
+        for name in names:
+            if name not in [stage.name for stage in self.stages]:
+                raise ValueError("no stage named %s" % repr(name))
+        # The stages to run: the given stages and their upstream stages.
+        selected = set()
+        queue = [stage for stage in self.stages if (stage.name in names) or (not names and not stage.manual)]
+        while queue:
+            stage = queue.pop()
+            if stage not in selected:
+                selected.add(stage)
+                queue.extend(self.upstream(stage))
+        pending = [stage for stage in self.stages if stage in selected]
+        results = {}   # Stage => result.
+        running = {}   # Process id => (stage, process, start time, reason).
+        processes = processes or cpu_count()
+        while pending or running:
+            # Decide for each stage whose upstream stages are done if it runs, or is skipped.
+            for stage in list(pending):
+                up = [s for s in self.upstream(stage) if s in selected]
+                if any(s not in results for s in up):
+                    continue
+                if dry and any(results[s]["status"] == "run" for s in up):
+                    r = "%s runs" % [s.name for s in up if results[s]["status"] == "run"][0]
+                elif any(results[s]["status"] in ("failed", "blocked") for s in up):
+                    results[stage] = self._result(stage, "blocked")
+                    pending.remove(stage)
+                    continue
+                elif stage.manual and stage.name not in names:
+                    results[stage] = self._result(stage, "manual")
+                    pending.remove(stage)
+                    continue
+                elif self._missing(stage):
+                    # An input that no stage writes is missing (Lexique380.txt).
+                    # We keep using the output files we have.
+                    results[stage] = self._result(stage, "kept", "%s is missing" % self._missing(stage))
+                    pending.remove(stage)
+                    continue
+                else:
+                    r = (force and (stage.name in names or not names)) and "forced" or self.changed(stage)
+                if not r:
+                    results[stage] = self._result(stage, "skipped")
+                elif dry:
+                    results[stage] = self._result(stage, "run", r)
+                elif len(running) < processes:
+                    print "%-14s running (%s)" % (stage.name, r)
+                    p = self._start(stage)
+                    running[p.pid] = (stage, p, time(), r)
+                else:
+                    continue
+                pending.remove(stage)
+            if not running:
+                continue
+            # Wait for any stage to finish.
+            pid, status, usage = os.wait4(-1, 0)
+            if pid not in running:
+                continue
+            stage, p, t, r = running.pop(pid)
+            t = time() - t
+            p.returncode = status
+            if status == 0:
+                self._state["stages"][stage.name] = {
+                    "fingerprint": self.fingerprint(stage),
+                        "outputs": dict((path, self.hash(path)) for path in stage.outputs),
+                        "seconds": t
+                }
+                self._save_state()
+                results[stage] = self._result(stage, "done", r, t, usage.ru_maxrss)
+                print "%-14s done (%.1fs)" % (stage.name, t)
+            else:
+                results[stage] = self._result(stage, "failed", r, t, usage.ru_maxrss)
+                print "%-14s failed, see %s" % (stage.name, os.path.join(LOGS, stage.name + ".log"))
+        results = [results[stage] for stage in self.stages if stage in results]
+        if not dry:
+            self._save_state()
+            self._save_log(results)
+        return results
+
+    def _missing(self, stage):
+        # Returns the first input of the given stage that doesn't exist and that no stage writes, or None.
+        for path in stage.inputs:
+            if path not in self._producers and not os.path.exists(self._path(path)):
+                return path
+
+    def _result(self, stage, status, reason="", seconds=0.0, rss=0):
+        # The time of the last successful run is reported as the time saved by skipping it.
+        s = self._state["stages"].get(stage.name)
+        return {
+               "stage": stage.name,
+              "status": status,
+              "reason": reason,
+             "seconds": seconds,
+               "saved": status in ("skipped", "manual", "kept") and s and s["seconds"] or 0.0,
+            "RSS (KB)": rss
+        }
+
+    def _save_state(self):
+        f = open(self.state + ".tmp", "w")
+        json.dump(self._state, f, indent=1, sort_keys=True)
+        f.close()
+        os.rename(self.state + ".tmp", self.state)
+
+    def _save_log(self, results):
+        # Appends the results of this run to pipeline-log.json, like bench-suite.py.
+        runs = os.path.exists(self.log) and json.load(open(self.log)) or []
+        runs.append({
+               "date": datetime.now().isoformat(),
+            "results": results
+        })
+        f = open(self.log + ".tmp", "w")
+        json.dump(runs, f, indent=1)
+        f.close()
+        os.rename(self.log + ".tmp", self.log)
+
+def report(results):
+    """ Prints a table of the given results: the status and time of each stage.
+    """
+    print
+    print "%-14s %-8s %10s %10s %12s  %s" % ("stage", "status", "time", "saved", "max RSS", "reason")
+    for r in results:
+        print "%-14s %-8s %9.1fs %9.1fs %9s KB  %s" % (
+            r["stage"], r["status"], r["seconds"], r["saved"], r["RSS (KB)"], r["reason"])
+    print "%-14s %-8s %9.1fs %9.1fs" % (
+        "total", "", sum(r["seconds"] for r in results), sum(r["saved"] for r in results))
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    force = "--force" in args
+    dry = "--dry" in args
+    names = [a for a in args if not a.startswith("--")]
+    t = time()
+    results = Pipeline().run(names, force=force, dry=dry)
+    report(results)
+    print "%-14s %-8s %9.1fs (stages in parallel)" % ("elapsed", "", time() - t)
+    sys.exit(any(r["status"] in ("failed", "blocked") for r in results) and 1 or 0)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from hashlib import sha1
+from time import time
+
+from pattern.db import Datasheet
+
+from instrument import count
+from tokenizer import words, folded
+
+import zlib
+import sqlite3
+
+# TOKEN CACHE
+# ===========
+# 4-svm.py, 5-annotation.py and 6-frequency.py all split the same reviews into words,
+# every time we run them. When we experiment with a new idea, that is wasted time.
+
+# The Cache class stores the list of words for each review in a small database on disk.
+# The key is a hash of the review text + the tokenizer function,
+# so if we change the tokenizer (its code), we don't get stale results.
+# The default tokenizer is tokenizer.words().
+# The cache has a maximum size. When it is full, the least recently used reviews are removed.
+# It counts hits (= review found) and misses (= review tokenized),
+# and the time saved by not tokenizing (= the time it took the first time - the time to look it up).
+# Splitting into words is fast, so the cache pays off most for slower tokenizers
+# (e.g., a part-of-speech tagger), but it tells you exactly how much it saves.
+
+def signature(tokenizer):
+    """ Returns a string that identifies the given tokenizer function and its code,
+        including the regular expressions it uses (e.g., tokenizer.TOKEN).
+    """
+    code = getattr(tokenizer, "func_code", None)
+    if code:
+        g = tokenizer.func_globals
+        patterns = [g[k].pattern for k in code.co_names if hasattr(g.get(k), "pattern")]
+        code = sha1(code.co_code + repr(code.co_consts) + repr(patterns)).hexdigest()[:8]
+    return "%s.%s:%s" % (tokenizer.__module__, tokenizer.__name__, code)
+
+class Cache(object):
+
+    def __init__(self, path="tokens.db", size=100*1024*1024):
+        """ A cache of tokenized strings, with a maximum size in bytes.
+        """
+        self.path = path
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0 # Number of seconds saved.
+        # Scripts that run at the same time (see pipeline.py) share the cache,
+        # so we wait for the other process to commit, instead of failing after 5 seconds.
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("create table if not exists tokens (key blob primary key, value blob, size integer, cost real, used integer)")
+        self._db.execute("create index if not exists tokens_used on tokens (used)")
+        self._bytes, self._clock = self._db.execute("select sum(size), max(used) from tokens").fetchone()
+        self._bytes = self._bytes or 0
+        self._clock = self._clock or 0
+        self._used = {} # Keys that were hit since the last commit.
+        self._new = 0
+        self._signatures = {}
+
+    def tokenize(self, s, tokenizer=words):
+        """ Returns the list of tokens for the given string,
+            from the cache or else from tokenizer(s).
+        """
+        t = time()
+        if tokenizer not in self._signatures:
+            self._signatures[tokenizer] = signature(tokenizer)
+        # A review can be a Unicode string or a UTF-8 byte string (e.g., from a Datasheet or a crawl).
+        # Byte strings are decoded first: the regular expression in words() only knows
+        # which bytes are letters in a Unicode string ("génial" would become "g" + "nial").
+        # The tokens are always Unicode, and both strings have the same key.
+        if isinstance(s, str):
+            s = s.decode("utf-8")
+        k = sha1(self._signatures[tokenizer] + s.encode("utf-8")).digest()
+        self._clock += 1
+        v = self._db.execute("select value, cost from tokens where key=?", (sqlite3.Binary(k),)).fetchone()
+        if v is not None:
+            # The time saved is the time it took to tokenize the string,
+            # minus the time it took to find it in the cache.
+            self.hits += 1
+            count("cache hits")
+            self._used[k] = self._clock
+            self.saved += v[1] - (time() - t)
+            v = zlib.decompress(v[0])
+            return v.decode("utf-8").split("\0")[1:]
+        self.misses += 1
+        count("cache misses")
+        t = time()
+        tokens = tokenizer(s)
+        t = time() - t
+        v = "".join("\0" + w for w in tokens)
+        v = sqlite3.Binary(zlib.compress(isinstance(v, unicode) and v.encode("utf-8") or v))
+        self._db.execute("insert or replace into tokens values (?, ?, ?, ?, ?)", (sqlite3.Binary(k), v, len(v), t, self._clock))
+        self._bytes += len(v)
+        self._new += 1
+        if self._new % 1000 == 0 or len(self._used) >= 10000:
+            self.commit()
+        return tokens
+
+    def commit(self):
+        """ Writes new entries and access times to disk, and removes old entries if the cache is full.
+        """
+        self._db.executemany("update tokens set used=? where key=?", [(v, sqlite3.Binary(k)) for k, v in self._used.items()])
+        self._used.clear()
+        if self._bytes > self.size:
+            # Remove the least recently used entries, until the cache is 90% full.
+            for k, n in self._db.execute("select key, size from tokens order by used").fetchall():
+                if self._bytes <= self.size * 0.9:
+                    break
+                self._db.execute("delete from tokens where key=?", (k,))
+                self._bytes -= n
+        self._db.commit()
+
+    def close(self):
+        self.commit()
+        self._db.close()
+
+    def __repr__(self):
+        return "Cache(hits=%s, misses=%s, saved=%.2fs, size=%.1fMB)" % (
+            self.hits, self.misses, self.saved, self._bytes / 1024.0 / 1024)
+
+# ADJECTIVES
+# ==========
+# 4-svm.py only keeps the adjectives in each review (see there why).
+# The functions are here, so that bench-suite.py times the same code.
+
+def adjectives(path="adj-fr.csv"):
+    """ Returns a dictionary of form => form for each adjective in the given lexicon,
+        where each form is also a key without accents (see tokenizer.folded()),
+        so that an adjective typed without accents becomes the same feature.
+    """
+    a = {}
+    for lemma, forms in Datasheet.load(path):
+        for form in forms.split(","):
+            a[form] = form
+    return folded(a)
+
+def normalize(review, adjectives, cache=None):
+    """ Returns the list of adjectives in the given string,
+        with the words from the given Cache, if any.
+    """
+    review = cache.tokenize(review, words) if cache else words(review)
+    return [adjectives[w] for w in review if w in adjectives]
@@ -0,0 +1,76 @@
+from itertools import groupby
+
+# THRESHOLD SWEEP
+# ===============
+# positive(review, threshold=0.0) predicts True if the score of a review is > threshold.
+# To find a good threshold, we could run the test for each candidate threshold,
+# but then we compute the score of every review again and again.
+
+# Instead, we compute each score once and sort the scores, highest-first.
+# If we lower the threshold past a score, that review becomes a positive prediction:
+# a true positive (TP) if it really is positive, a false positive (FP) otherwise.
+# So walking down the sorted list, we can keep a running count of TP and FP,
+# and get accuracy, precision, recall and F1-score for every possible threshold,
+# in O(n log n) for sorting + O(n) for the walk.
+
+# This works with any kind of score: the average sentiment score of a review (5-annotation.py),
+# the probability or decision value of an SVM (4-svm.py), ...
+
+# The ROC curve plots the true positive rate (= recall) against the false positive rate.
+# The area under the curve (AUC) is the probability that a random positive review
+# gets a higher score than a random negative review (0.5 = random guessing, 1.0 = perfect).
+
+def sweep(scores, labels):
+    """ Returns a list of (threshold, accuracy, precision, recall, F1-score, false positive rate)-tuples,
+        for each threshold at which the predictions (score > threshold) change,
+        from the highest threshold (nothing is positive) to the lowest (everything is positive).
+        The labels are True (positive) or False.
+    """
+    P = sum(1 for x in labels if x)
+    N = len(labels) - P
+    TP = 0
+    FP = 0
+    curve = []
+    def point(threshold):
+        precision = TP / float(TP + FP or 1)
+        recall = TP / float(P or 1)
+        curve.append((threshold,
+            (TP + N - FP) / float(P + N or 1),
+            precision,
+            recall,
+            2 * precision * recall / (precision + recall or 1),
+            FP / float(N or 1)
+        ))
+    for score, group in groupby(sorted(zip(scores, labels), reverse=True), key=lambda x: x[0]):
+        point(score) # score > score is False, so this group is not yet positive.
+        for s, x in group:
+            if x:
+                TP += 1
+            else:
+                FP += 1
+    point(float("-inf"))
+    return curve
+
+def auc(curve):
+    """ Returns the area under the ROC curve (trapezoidal rule), for the output of sweep().
+    """
+    a = 0.0
+    for (t0, A0, P0, R0, F0, x0), (t1, A1, P1, R1, F1, x1) in zip(curve, curve[1:]):
+        a += (x1 - x0) * (R0 + R1) / 2
+    return a
+
+def average_precision(curve):
+    """ Returns the area under the precision-recall curve, for the output of sweep().
+    """
+    a = 0.0
+    for (t0, A0, P0, R0, F0, x0), (t1, A1, P1, R1, F1, x1) in zip(curve, curve[1:]):
+        a += (R1 - R0) * P1
+    return a
+
+ACCURACY, PRECISION, RECALL, F1 = 1, 2, 3, 4
+
+def best(curve, metric=F1):
+    """ Returns the (threshold, accuracy, precision, recall, F1-score, false positive rate)-tuple
+        with the highest F1-score (or ACCURACY, PRECISION, RECALL).
+    """
+    return max(curve, key=lambda p: p[metric])
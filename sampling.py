@@ -0,0 +1,103 @@
+from random import Random
+from math import exp, log, floor
+
+# STRATIFIED SAMPLING
+# ===================
+# 3-aligned.py used to keep the first 500 negative and positive reviews it read.
+# The crawler reads books one after another, so those were mostly reviews of the first books.
+# It also kept all reviews in memory until the end.
+
+# Reservoir sampling picks k items at random from a stream of unknown length, in one pass:
+# every item has the same chance to be in the sample, whether it comes first or last,
+# and only the k items in the sample are kept in memory.
+# We use "Algorithm L" (Li, 1994): instead of drawing a random number for each item,
+# it computes how many items to skip until the next one that goes into the sample,
+# so most items are just counted.
+
+# Stratified sampling keeps a reservoir per class (e.g., positive and negative reviews),
+# so that we can take an equal number of reviews from each class.
+# The classes are a dict of star rating => class. Star ratings that are not in the dict are skipped.
+BINARY = {1.0: False, 2.0: False, 4.0: True, 5.0: True} # Neutral reviews (3 stars) are skipped.
+STARS = {1.0: 1, 2.0: 2, 3.0: 3, 4.0: 4, 5.0: 5}
+
+class Reservoir(object):
+
+    def __init__(self, k=500, random=None):
+        """ A random sample of at most k of the items that are added.
+        """
+        self.k = k
+        self.n = 0 # Number of items added.
+        self.items = []
+        self.random = random or Random()
+        self._w = 1.0
+        self._next = k - 1
+
+    def _skip(self):
+        # Returns the position of the next item that goes into the sample.
+        r = self.random
+        self._w *= exp(log(1.0 - r.random()) / self.k)
+        return self._next + int(floor(log(1.0 - r.random()) / log(1.0 - self._w) if self._w < 1 else 0)) + 1
+
+    def add(self, item):
+        if self.n < self.k:
+            self.items.append(item)
+            if self.n == self.k - 1:
+                self._next = self._skip()
+        elif self.n == self._next:
+            self.items[self.random.randrange(self.k)] = item
+            self._next = self._skip()
+        self.n += 1
+
+class Stratified(object):
+
+    def __init__(self, classes=BINARY, k=500, seed=None):
+        """ A random sample of at most k items for each class.
+            The classes are a dict of star rating => class.
+            With the same seed (and the same data), the sample is the same.
+        """
+        self.classes = classes
+        self.k = k
+        self.random = Random(seed)
+        self.reservoirs = {}
+
+    def add(self, item, score):
+        """ Adds the given item with the given star rating.
+        """
+        c = self.classes.get(float(score))
+        if c is None:
+            return
+        if c not in self.reservoirs:
+            self.reservoirs[c] = Reservoir(self.k, self.random)
+        self.reservoirs[c].add(item)
+
+    def aligned(self):
+        """ Returns a shuffled list of (item, class)-tuples,
+            with the same number of items for each class.
+        """
+        m = min([len(r.items) for r in self.reservoirs.values()] or [0])
+        data = []
+        for c, r in sorted(self.reservoirs.items()):
+            items = list(r.items)
+            self.random.shuffle(items) # A random m of the k items.
+            data.extend((item, c) for item in items[:m])
+        self.random.shuffle(data)
+        return data
+
+    def split(self, data, splits=(("train", 0.8), ("test", 0.2))):
+        """ Returns a dict of name => list of (item, class)-tuples,
+            for the given list of (name, fraction)-tuples.
+            Each class is split separately, so that each part has the same number of items per class.
+        """
+        classes = {}
+        for item, c in data:
+            classes.setdefault(c, []).append((item, c))
+        parts = dict((name, []) for name, fraction in splits)
+        for c, items in sorted(classes.items()):
+            i = 0.0
+            for name, fraction in splits:
+                j = i + fraction * len(items)
+                parts[name].extend(items[int(round(i)):int(round(j))])
+                i = j
+        for name, fraction in splits:
+            self.random.shuffle(parts[name])
+        return parts
@@ -0,0 +1,62 @@
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from random import random
+from time import sleep
+
+import re
+import os
+import sys
+
+# STAND-IN AMAZON
+# ===============
+# A local web server that serves the pages in fixtures/
+# with the same URL's as Amazon.fr, so we can test the crawler without mining Amazon:
+# - /s/ref=sr_pg_1?...&page=1      => fixtures/listing.html (3 books per page),
+# - /product-reviews/<id>/         => fixtures/reviews.html (3 reviews per book).
+# A fraction of the requests can fail with "503 Service Unavailable" to test retries.
+# Usage: python serve-fixtures.py [port] [error rate] [delay in seconds]
+# Then:  python 2-amazon.py http://localhost:8000
+# The reviews are saved in books-fr.localhost-8000.csv, not in books-fr.csv.
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LISTING = open(os.path.join(FIXTURES, "listing.html")).read()
+REVIEWS = open(os.path.join(FIXTURES, "reviews.html")).read()
+
+class Handler(BaseHTTPRequestHandler):
+
+    errors = 0.0
+    delay = 0.0
+
+    def do_GET(self):
+        sleep(self.delay)
+        if random() < self.errors:
+            self.send_error(503)
+            return
+        m1 = re.match(r"^/s/ref=sr_pg_(\d+)", self.path)
+        m2 = re.match(r"^/product-reviews/(\w+)/", self.path)
+        if m1:
+            html = LISTING.replace("{page}", m1.group(1))
+        elif m2:
+            html = REVIEWS.replace("{id}", m2.group(1))
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.end_headers()
+        self.wfile.write(html)
+
+    def log_message(self, *args):
+        pass
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+if __name__ == "__main__":
+    port = len(sys.argv) > 1 and int(sys.argv[1]) or 8000
+    Handler.errors = len(sys.argv) > 2 and float(sys.argv[2]) or 0.0
+    Handler.delay = len(sys.argv) > 3 and float(sys.argv[3]) or 0.0
+    print "serving fixtures at http://localhost:%s/" % port
+    Server(("", port), Handler).serve_forever()
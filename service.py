@@ -0,0 +1,190 @@
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from Queue import Queue, Empty
+from threading import Thread, Event, Lock
+from collections import deque
+from urlparse import urlparse, parse_qs
+from time import time
+
+import os
+import imp
+import sys
+import json
+
+# SENTIMENT SERVICE
+# =================
+# 7-sentiment.py is the part of the workshop you can bundle in an application.
+# This is such an application: a web service that loads the lexicon once,
+# and then scores texts sent to it over HTTP:
+# - POST / with a text                     => {"score": 0.35, "positive": true}
+# - POST / with a JSON array of texts      => [{"score": ..., "positive": ...}, ...]
+#   (or a JSON string), with Content-Type: application/json
+#   Any other Content-Type (e.g., text/plain) is a text, even if it starts with [ or ".
+#   The body is UTF-8.
+# - GET  /metrics                          => latency and throughput statistics
+# An optional ?threshold=0.0 is passed to positive().
+
+# Each request is handled in its own thread.
+# Instead of scoring each text separately, the threads put their texts in a queue.
+# A single batcher thread takes texts from the queue until it has a batch of up to n texts,
+# or until the first text has waited m milliseconds,
+# and then scores the whole batch at once with score_batch() (a single matrix-vector product).
+# Under load, concurrent requests are coalesced into micro-batches.
+# New scores in the .csv files are used without restarting the service (see lexicon.Manager).
+# Usage: python service.py [port] [max batch size] [max wait in ms]
+
+# 7-sentiment.py is not a valid module name, so we load it by path.
+sentiment = imp.load_source("sentiment", os.path.join(os.path.dirname(os.path.abspath(__file__)), "7-sentiment.py"))
+
+class Batcher(object):
+
+    def __init__(self, score=sentiment.score_batch, size=256, wait=0.005):
+        """ Scores texts in batches of at most size texts,
+            waiting at most wait seconds for a batch to fill up.
+        """
+        self.score = score
+        self.size = size
+        self.wait = wait
+        self.queue = Queue()
+        self.batches = 0
+        self.texts = 0
+        t = Thread(target=self._run)
+        t.daemon = True
+        t.start()
+
+    def __call__(self, texts):
+        """ Returns a list of scores for the given list of texts (blocks until they are scored).
+        """
+        request = (texts, [], Event())
+        self.queue.put(request)
+        request[2].wait()
+        return request[1]
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            n = len(batch[0][0])
+            t = time() + self.wait
+            while n < self.size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, t - time())))
+                    n += len(batch[-1][0])
+                except Empty:
+                    break
+            a = [s for request in batch for s in request[0]]
+            try:
+                scores = self.score(a).tolist()
+            except Exception, e:
+                sys.stderr.write("%s\n" % e)
+                scores = [None] * len(a) # Unblock the requests, see Handler.
+            i = 0
+            for texts, results, event in batch:
+                results.extend(scores[i:i+len(texts)])
+                event.set()
+                i += len(texts)
+            self.batches += 1
+            self.texts += len(a)
+
+class Metrics(object):
+
+    def __init__(self, n=10000):
+        """ Keeps the latency of the last n requests.
+        """
+        self.start = time()
+        self.requests = 0
+        self.texts = 0
+        self.latency = deque(maxlen=n)
+        self._lock = Lock()
+
+    def add(self, texts, latency):
+        with self._lock:
+            self.requests += 1
+            self.texts += texts
+            self.latency.append(latency)
+
+    def percentile(self, p):
+        with self._lock:
+            a = sorted(self.latency)
+        return a and a[min(len(a) - 1, int(p * len(a)))] or 0.0
+
+    def json(self, batcher):
+        t = time() - self.start
+        return {
+                  "requests": self.requests,
+                     "texts": self.texts,
+                   "batches": batcher.batches,
+                "batch size": batcher.texts / float(batcher.batches or 1),
+                   "reloads": sentiment.manager and sentiment.manager.reloads or 0,
+                  "p50 (ms)": self.percentile(0.50) * 1000,
+                  "p99 (ms)": self.percentile(0.99) * 1000,
+            "requests / sec": self.requests / t,
+               "texts / sec": self.texts / t
+        }
+
+class Handler(BaseHTTPRequestHandler):
+
+    batcher = None
+    metrics = None
+
+    def respond(self, code, data):
+        data = json.dumps(data)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/metrics":
+            self.respond(200, self.metrics.json(self.batcher))
+        else:
+            self.respond(404, {"error": "not found"})
+
+    def do_POST(self):
+        t = time()
+        q = parse_qs(urlparse(self.path).query)
+        try:
+            s = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            threshold = float(q.get("threshold", [0.0])[0])
+            if self.headers.get("Content-Type", "").split(";")[0].strip().lower() == "application/json":
+                texts = json.loads(s)
+            else:
+                texts = s
+        except (ValueError, UnicodeDecodeError), e:
+            self.respond(400, {"error": str(e)})
+            return
+        single = not isinstance(texts, list)
+        if single:
+            texts = [texts]
+        if not all(isinstance(x, basestring) for x in texts):
+            self.respond(400, {"error": "expected a text or a JSON array of texts"})
+            return
+        scores = self.batcher(texts)
+        if None in scores:
+            self.respond(500, {"error": "scoring failed"})
+            return
+        results = [{"score": v, "positive": v > threshold} for v in scores]
+        self.metrics.add(len(texts), time() - t)
+        self.respond(200, results[0] if single else results)
+
+    def log_message(self, *args):
+        pass
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128 # The default (5) drops connections under load.
+
+def serve(port=8080, size=256, wait=0.005):
+    """ Starts the service at http://localhost:port/ (blocks).
+    """
+    sentiment.watch()
+    Handler.batcher = Batcher(size=size, wait=wait)
+    Handler.metrics = Metrics()
+    Server(("", port), Handler).serve_forever()
+
+if __name__ == "__main__":
+    port = len(sys.argv) > 1 and int(sys.argv[1]) or 8080
+    size = len(sys.argv) > 2 and int(sys.argv[2]) or 256
+    wait = len(sys.argv) > 3 and float(sys.argv[3]) / 1000 or 0.005
+    print "serving sentiment at http://localhost:%s/" % port
+    serve(port, size, wait)
@@ -0,0 +1,114 @@
+from pattern.db import Datasheet
+
+from numpy import array, arange, zeros, full, repeat, cumsum, searchsorted, where, maximum, log
+from numpy.random import RandomState
+
+from lexicon import ADJECTIVES, load_csv
+from corpus import CorpusWriter
+
+import os
+
+# SYNTHETIC REVIEWS
+# =================
+# books-fr.csv has about 5,000 reviews. That is enough to train a classifier,
+# but not to see how the scripts behave with 100x or 1000x more data.
+# This module generates any number of random French "reviews" with a star rating.
+# They are not real French, but they have the properties that matter for performance:
+# - the words are adjectives from adj-fr.csv mixed with common French words,
+# - adjectives are drawn with a Zipf distribution: adj-fr.csv is sorted by frequency (see 1-lexique.py),
+#   so the lemma at rank i has a probability proportional to 1/i, divided over its forms,
+# - the star ratings are skewed like books-fr.csv (56% ***** vs 5% *, see 3-aligned.py),
+# - the length of a review varies like books-fr.csv (half are shorter than 80 words, the average is 120),
+# - in positive (4-5 star) reviews, half of the adjectives are drawn from adjectives
+#   with a positive score in the sentiment lexicon, and vice versa for negative reviews,
+#   so a classifier has something to learn.
+# The random numbers are generated with NumPy, a chunk of reviews at a time,
+# so that millions of reviews take seconds instead of minutes.
+
+FILLER = (
+    "le la les un une de des du et est a en au que qui ne pas plus tres ce cette ces il elle on je "
+    "nous vous mais pour dans sur avec par se son sa ses tout bien livre roman histoire auteur "
+    "lecture personnages fin page pages style"
+).split()
+
+# Star rating => probability, as in books-fr.csv.
+STARS = [
+    (1.0, 0.05),
+    (2.0, 0.05),
+    (3.0, 0.10),
+    (4.0, 0.24),
+    (5.0, 0.56)
+]
+
+def reviews(n=10000, lexicon=None, sentiment=None, length=None, density=0.1, polarity=0.5, seed=0, chunk=10000):
+    """ Yields n random (review, score)-tuples, with a float score (1.0-5.0).
+        The lexicon is a list of (lemma, forms)-rows (by default, adj-fr.csv).
+        The sentiment is a dict of form => score (by default, the sentiment lexicon).
+        Each review has the given number of words, or a random length like books-fr.csv.
+        The density is the share of words that are adjectives;
+        the polarity is the share of adjectives that agree with the star rating.
+        With the same seed, the same reviews are generated.
+    """
+    if lexicon is None:
+        lexicon = Datasheet.load(ADJECTIVES)
+    if sentiment is None:
+        sentiment = load_csv()
+    # Each form gets a column; the filler words come first.
+    words = list(FILLER)
+    weights = []
+    for i, (lemma, forms) in enumerate(lexicon):
+        forms = forms.split(",")
+        for form in forms:
+            words.append(form)
+            weights.append(1.0 / (i + 1) / len(forms))
+    words = array(words, dtype=object)
+    weights = array(weights)
+    scores = array([sentiment.get(w, 0.0) for w in words[len(FILLER):]])
+    # Cumulative weights of all adjectives, positive adjectives and negative adjectives.
+    # A random number in 0.0-total is then mapped to an adjective with a binary search.
+    pools = [
+        cumsum(weights),
+        cumsum(weights * (scores > 0)),
+        cumsum(weights * (scores < 0))
+    ]
+    r = RandomState(seed)
+    stars = array([s for s, p in STARS])
+    p = [p for s, p in STARS]
+    for i in xrange(0, n, chunk):
+        m = min(chunk, n - i)
+        score = stars[r.choice(len(stars), m, p=p)]
+        if length:
+            k = full(m, length, dtype=int)
+        else:
+            k = maximum(1, r.lognormal(log(81), 0.9, m).astype(int))
+        # Token j belongs to review j2r[j].
+        j2r = repeat(arange(m), k)
+        ids = r.randint(0, len(FILLER), len(j2r))
+        a = where(r.random_sample(len(j2r)) < density)[0]
+        s = score[j2r[a]]
+        b = r.random_sample(len(a)) < polarity
+        pool = zeros(len(a), dtype=int)
+        pool[b & (s > 3)] = 1
+        pool[b & (s < 3)] = 2
+        for j, c in enumerate(pools):
+            x = a[pool == j]
+            if c[-1] > 0:
+                ids[x] = len(FILLER) + searchsorted(c, r.random_sample(len(x)) * c[-1], side="right").clip(0, len(c) - 1)
+        tokens = words[ids]
+        end = cumsum(k)
+        for j in xrange(m):
+            yield " ".join(tokens[end[j] - k[j]:end[j]]) + ".", float(score[j])
+
+def save(path, n=10000, **kwargs):
+    """ Writes n random reviews to the given .csv file, in the same format as books-fr.csv.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    f = CorpusWriter(path, fields=2, fsync=100000)
+    f.extend(reviews(n, **kwargs))
+    f.close()
+
+if __name__ == "__main__":
+    for review, score in reviews(3):
+        print score, review
+        print
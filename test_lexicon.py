@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import imp
+import shutil
+import tempfile
+import unittest
+
+import lexicon
+
+# Tests that 7-sentiment.py works with the compiled lexicon (python lexicon.py) and FOLD = True.
+# Usage: python test_lexicon.py
+
+SENTIMENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "7-sentiment.py")
+
+class TestCompiledLexicon(unittest.TestCase):
+
+    def setUp(self):
+        # A folder with the .csv files and a compiled lexicon that is newer (fresh).
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        os.chdir(self.folder)
+        for path in (lexicon.SHEET, lexicon.ADJECTIVES):
+            open(path, "w").close()
+            os.utime(path, (0, 0))
+        lexicon.compile(sentiment={u"génial": 1.0, u"décevant": -1.0, u"ferme": 0.5, u"fermé": -0.5})
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def test_compile(self):
+        # The compiled lexicon has the keys without accents,
+        # except where the word without accents is a different word.
+        table = lexicon.Lexicon()
+        self.assertTrue(table.folded)
+        self.assertEqual(table[u"genial"], table[u"génial"])
+        self.assertEqual(table[u"decevant"], -1.0)
+        self.assertEqual(table[u"ferme"], 0.5)
+        self.assertEqual(len(table), 6)
+        lexicon.compile(sentiment={u"génial": 1.0}, fold=False)
+        self.assertFalse(lexicon.Lexicon().folded)
+        self.assertFalse(u"genial" in lexicon.Lexicon())
+
+    def test_load(self):
+        self.assertTrue(isinstance(lexicon.load(fold=True), lexicon.Lexicon))
+        self.assertTrue(isinstance(lexicon.load(), lexicon.Lexicon))
+
+    def test_sentiment(self):
+        # 7-sentiment.py uses the compiled lexicon as it is, without copying it into a dict.
+        sentiment = imp.load_source("sentiment", SENTIMENT)
+        self.assertTrue(sentiment.FOLD)
+        self.assertTrue(isinstance(sentiment.sentiment, lexicon.Lexicon))
+        self.assertEqual(sentiment.score(u"un livre genial"), 1.0)
+        self.assertEqual(sentiment.positive_batch([u"génial", u"genial", u"decevant"]), [True, True, False])
+        # A reloaded table (see watch()) is a dict, which gets the keys without accents too.
+        sentiment._swap({u"génial": 1.0, u"décevant": -1.0})
+        self.assertEqual(sentiment.positive_batch([u"genial", u"decevant"]), [True, False])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from preprocess import Cache
+
+# Tests that the token cache (see preprocess.py) splits UTF-8 byte strings into whole words.
+# Usage: python test_preprocess.py
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = Cache(os.path.join(self.folder, "tokens.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def test_tokenize(self):
+        # A byte string is decoded, so accented words are not split ("g\xc3", "nial").
+        # The tokens are the same from the cache, and the same as for the Unicode string.
+        s = u"Un livre génial, très décevant à la fin."
+        for i in range(2):
+            self.assertEqual(self.cache.tokenize(s.encode("utf-8")), [u"un", u"livre", u"génial", u"très", u"décevant", u"à", u"la", u"fin"])
+        self.assertEqual(self.cache.tokenize(s), self.cache.tokenize(s.encode("utf-8")))
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 1))
+
+if __name__ == "__main__":
+    unittest.main()
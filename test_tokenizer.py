@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from tokenizer import words
+
+# Tests that words() returns whole words for Unicode strings and UTF-8 byte strings.
+# Usage: python test_tokenizer.py
+
+class TestWords(unittest.TestCase):
+
+    def test_words(self):
+        s = u"«Génial» (vraiment), mais trop long... d'excellents moments!"
+        w = [u"génial", u"vraiment", u"mais", u"trop", u"long", u"d", u"excellents", u"moments"]
+        self.assertEqual(words(s), w)
+        # A byte string is decoded, instead of being split at each accented letter.
+        self.assertEqual(words(s.encode("utf-8")), w)
+        self.assertEqual(words("un livre \xc3\xa9mouvant"), [u"un", u"livre", u"émouvant"])
+
+    def test_type(self):
+        self.assertRaises(TypeError, words, None)
+        self.assertRaises(TypeError, words, [u"génial"])
+        self.assertRaises(UnicodeDecodeError, words, u"génial".encode("latin-1"))
+
+if __name__ == "__main__":
+    unittest.main()
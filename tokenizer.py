@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from unicodedata import normalize, combining
+
+import re
+
+# TOKENIZER
+# =========
+# The scripts used to split reviews into words with:
+#
+#    [w.strip(",.!?") for w in review.replace("\n", " ").lower().split(" ")]
+#
+# That makes a few new strings for each word, and it misses words next to other punctuation:
+# "(excellent)", "«génial»", "nul...", "d'excellents" and "bon;" are not found in the lexicon.
+
+# The words() function lowercases the review once and finds all the words with one regular expression,
+# compiled once. A word is a run of letters or digits, with hyphens ("aigre-doux").
+# Everything else is a separator, including the apostrophe: "d'excellents" => "d", "excellents".
+# The tokens are lowercase, so they can be looked up in the lexicon as they are.
+TOKEN = re.compile(r"\w[\w-]*", re.U)
+
+# The regular expression only knows which characters are letters in a Unicode string.
+# In a UTF-8 byte string, "génial" would be split into "g\xc3" and "nial",
+# so byte strings are decoded first. Anything else (e.g., a list of words) is an error.
+
+def words(s):
+    """ Returns a list of lowercase words in the given string (Unicode, or UTF-8 bytes).
+        Punctuation marks, quotes, brackets, apostrophes, ... are separators.
+    """
+    if isinstance(s, str):
+        s = s.decode("utf-8")
+    elif not isinstance(s, unicode):
+        raise TypeError("words() expects a string, not %s" % type(s).__name__)
+    return TOKEN.findall(s.lower())
+
+# Reviews are often typed without accents: "genial", "decevant", "tres interessant".
+# The lexicon only has "génial", "décevant" and "intéressant".
+# Instead of removing the accents from every word in every review,
+# we remove them once from every form in the lexicon, and add the result as another key:
+# folded(lexicon) has both "génial" and "genial" (with the same value).
+# If a word with and without accents are both in the lexicon ("fermé" and "ferme"),
+# the word without accents keeps its own value.
+# If two different forms have the same key without accents, but a different value,
+# the key is left out (we can't know which one was meant).
+
+LIGATURES = {u"œ": u"oe", u"æ": u"ae", u"Œ": u"OE", u"Æ": u"AE"}
+
+def fold(w):
+    """ Returns the given string without accents (e.g., "très" => "tres", "cœur" => "coeur").
+    """
+    w = u"".join(ch for ch in normalize("NFKD", w) if not combining(ch))
+    for k, v in LIGATURES.items():
+        w = w.replace(k, v)
+    return w
+
+def folded(lexicon):
+    """ Returns a copy of the given dictionary of word => value,
+        where each word is also a key without its accents.
+    """
+    keys = {}
+    for w, v in lexicon.iteritems():
+        k = fold(w)
+        if k != w and k not in lexicon:
+            keys.setdefault(k, []).append(v)
+    lexicon = dict(lexicon)
+    for k, v in keys.iteritems():
+        if all(x == v[0] for x in v):
+            lexicon[k] = v[0]
+    return lexicon